@@ -0,0 +1,46 @@
+from typing import Any, Container, Dict, List
+
+
+class BotAccount:
+    """单个 QQ 账号
+
+    AstrBot 的 aiocqhttp 适配器在多个账号间共用一个 bot 实例，
+    调用时通过 self_id 参数路由到对应账号的连接。api 属性与 bot 实例保持一致的调用方式。
+    """
+
+    def __init__(self, self_id: str, bot: Any):
+        self.self_id = str(self_id)
+        self.bot = bot
+
+    @property
+    def api(self) -> "BotAccount":
+        return self
+
+    async def call_action(self, action: str, **params) -> Any:
+        return await self.bot.api.call_action(action, self_id=int(self.self_id), **params)
+
+
+def shard_groups(
+    groups: List[str],
+    memberships: Dict[str, Container[str]],
+    default_account: str,
+) -> Dict[str, List[int]]:
+    """把群分配给所在的账号，多个账号都在群里时分给当前负载最小的账号
+
+    只有一个候选账号的群先分配，再按负载分配共享群，使各账号数量尽量均衡。
+    返回 {账号: [群在 groups 中的下标]}（升序），没有任何账号在群里的群分给 default_account
+    """
+    load = {self_id: 0 for self_id in memberships}
+    load.setdefault(default_account, 0)
+    candidates = [
+        [self_id for self_id, members in memberships.items() if group_id in members] or [default_account]
+        for group_id in groups
+    ]
+    shards: Dict[str, List[int]] = {}
+    for index in sorted(range(len(groups)), key=lambda i: len(candidates[i])):
+        self_id = min(candidates[index], key=load.__getitem__)
+        load[self_id] += 1
+        shards.setdefault(self_id, []).append(index)
+    for indices in shards.values():
+        indices.sort()
+    return shards
@@ -0,0 +1,155 @@
+"""内存压测：模拟大量群打卡一轮，测量进程峰值 RSS
+
+每次测量在独立子进程中运行（峰值 RSS 是进程级的），可以同时测量某个 git 提交的插件代码作为对照:
+
+    python benchmarks/bench_memory.py --groups 50000
+    python benchmarks/bench_memory.py --groups 50000 --baseline HEAD~1
+
+--baseline 会把该提交的插件代码导出到临时目录，用同样的模拟接口和参数运行，输出两者的对比。
+与 bench_sign.py 一样需要在装有 AstrBot 的环境中运行。
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+SELF_ID = "10000"
+
+
+class BehaviorContext:
+    """Context 替身：回退发送也走 ServerBehavior，错误率同样生效，且不保存发送的消息"""
+
+    def __init__(self, behavior):
+        self.behavior = behavior
+
+    async def send_message(self, session: str, message_chain: Any):
+        await self.behavior.handle("send_group_msg", {"session": session})
+        return True
+
+
+def rss_mb() -> float:
+    """当前进程的峰值 RSS（MB），Linux 下 ru_maxrss 单位为 KB，macOS 下为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+async def measure(plugin_dir: Path, args) -> Dict[str, Any]:
+    """在当前进程中运行一轮全群打卡，返回峰值 RSS"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    sys.path.insert(0, str(plugin_dir.parent))
+    from fake_onebot import FakeBot, FakeBotApi, ServerBehavior
+    from stubs import StubConfig, StubEvent
+
+    module = importlib.import_module(f"{plugin_dir.name}.main")
+    data_dir = Path(tempfile.mkdtemp(prefix="qq_group_sign_mem_"))
+    module.StarTools.get_data_dir = staticmethod(lambda *a, **k: data_dir)
+    behavior = ServerBehavior(
+        groups=args.groups, latency=args.latency, error_rate=args.error_rate, seed=args.seed
+    )
+    config = StubConfig(
+        enable_auto_sign=False,
+        whitelist_mode=False,
+        admin_notification=False,
+        retry_enabled=False,
+        sign_concurrency=args.concurrency,
+        sign_rate_limit=0,
+        progress_interval_seconds=0,
+    )
+    rss_before = rss_mb()
+
+    plugin = module.QQGroupSignPlugin(BehaviorContext(behavior), config)
+    await plugin._initialized.wait()
+    bot = FakeBot(FakeBotApi(behavior))
+    plugin.bot_instance = bot
+    plugin.platform_name = "aiocqhttp"
+    plugin.accounts = {SELF_ID: module.BotAccount(SELF_ID, bot)}
+
+    start = time.perf_counter()
+    replies = [reply async for reply in plugin.sign_all_groups(StubEvent())]
+    elapsed = time.perf_counter() - start
+    await plugin.terminate()
+    return {
+        "groups": args.groups,
+        "seconds": round(elapsed, 2),
+        "success": plugin.sign_statistics["success_count"],
+        "failed": plugin.sign_statistics["fail_count"],
+        "reply_chars": sum(len(reply) for reply in replies),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(rss_mb(), 1),
+        "peak_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def export_revision(revision: str) -> Path:
+    """把指定提交的插件代码导出到临时目录，目录名与插件目录相同以保持包名"""
+    archive = subprocess.run(
+        ["git", "-C", str(PLUGIN_DIR), "archive", "--format=tar", revision],
+        check=True, capture_output=True,
+    ).stdout
+    target = Path(tempfile.mkdtemp(prefix="qq_group_sign_rev_")) / PLUGIN_DIR.name
+    target.mkdir()
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def run_worker(plugin_dir: Path, args) -> Dict[str, Any]:
+    command = [
+        sys.executable, __file__, "--worker", str(plugin_dir),
+        "--groups", str(args.groups), "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate), "--concurrency", str(args.concurrency),
+        "--seed", str(args.seed),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QQ群打卡插件内存压测")
+    parser.add_argument("--groups", type=int, default=50000, help="模拟的群数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟接口平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="打卡接口和回退发送各自随机失败的比例")
+    parser.add_argument("--concurrency", type=int, default=200, help="插件打卡并发上限")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="作为对照的 git 提交，例如 HEAD~1")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(args):
+    if args.worker:
+        print(json.dumps(asyncio.run(measure(Path(args.worker), args))))
+        return
+
+    results = {}
+    if args.baseline:
+        results[args.baseline] = run_worker(export_revision(args.baseline), args)
+    results["当前"] = run_worker(PLUGIN_DIR, args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    columns = [
+        ("seconds", "耗时s"), ("success", "成功"), ("failed", "失败"), ("reply_chars", "回复字数"),
+        ("rss_before_mb", "初始RSS MB"), ("peak_rss_mb", "峰值RSS MB"), ("peak_growth_mb", "增长 MB"),
+    ]
+    rows = [["版本"] + [label for _, label in columns]]
+    rows += [[name] + [str(result[key]) for key, _ in columns] for name, result in results.items()]
+    widths = [max(len(row[i]) for row in rows) + 2 for i in range(len(rows[0]))]
+    print(f"{args.groups} 个群:")
+    print("\n".join("".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,194 @@
+"""打卡压测：用模拟的 OneBot 服务端驱动真实插件
+
+需要在装有 AstrBot 的环境中运行（插件依赖 astrbot.api），在插件目录下执行:
+
+    python benchmarks/bench_sign.py --groups 10,1000,10000
+    python benchmarks/bench_sign.py --transport http --latency 0.05 --error-rate 0.05 --server-rate-limit 200
+
+每个规模使用新的插件实例和临时数据目录，输出吞吐量、单群打卡耗时 p50/p99、
+峰值内存和文件写入次数。
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from aiohttp import ClientSession, TCPConnector
+
+from fake_onebot import FakeBot, FakeBotApi, FakeOneBotServer, OneBotHttpApi, ServerBehavior, percentile
+from stubs import StubConfig, StubContext, StubEvent
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+SELF_ID = "10000"
+
+
+def load_plugin_module():
+    """以包的形式导入插件（插件内部使用相对导入）"""
+    sys.path.insert(0, str(PLUGIN_DIR.parent))
+    return importlib.import_module(f"{PLUGIN_DIR.name}.main")
+
+
+class WriteCounter:
+    """统计存储后端的文档写入和历史追加次数"""
+
+    def __init__(self, backend):
+        self.documents = 0
+        self.history_appends = 0
+        write_document = backend.write_document
+        sink = backend.history_sink
+        append = sink.append
+
+        def counted_write(name, content):
+            self.documents += 1
+            return write_document(name, content)
+
+        def counted_append(records, tz):
+            self.history_appends += 1
+            return append(records, tz)
+
+        backend.write_document = counted_write
+        sink.append = counted_append
+
+
+async def run_case(module, groups: int, args, session) -> Dict[str, Any]:
+    behavior = ServerBehavior(
+        groups=groups,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.server_rate_limit,
+        unsupported=args.unsupported,
+        seed=args.seed,
+    )
+    server = None
+    if args.transport == "http":
+        server = FakeOneBotServer(behavior)
+        await server.start()
+        api = OneBotHttpApi(server.url, session)
+    else:
+        api = FakeBotApi(behavior)
+
+    data_dir = Path(tempfile.mkdtemp(prefix="qq_group_sign_bench_"))
+    module.StarTools.get_data_dir = staticmethod(lambda *a, **k: data_dir)
+    config = StubConfig(
+        enable_auto_sign=False,
+        whitelist_mode=False,
+        admin_notification=False,
+        retry_enabled=False,
+        storage_backend=args.backend,
+        sign_concurrency=args.concurrency,
+        sign_rate_limit=args.rate,
+        sign_rate_burst=max(1, args.concurrency),
+        progress_interval_seconds=0,
+    )
+    context = StubContext(latency=args.latency)
+
+    tracemalloc.start()
+    plugin = module.QQGroupSignPlugin(context, config)
+    await plugin._initialized.wait()
+    writes = WriteCounter(plugin.backend)
+    bot = FakeBot(api)
+    plugin.bot_instance = bot
+    plugin.platform_name = "aiocqhttp"
+    plugin.accounts = {SELF_ID: module.BotAccount(SELF_ID, bot)}
+
+    latencies: List[float] = []
+    perform = plugin._perform_group_sign
+
+    async def timed_perform(group_id, bot=None):
+        start = time.perf_counter()
+        try:
+            return await perform(group_id, bot)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    plugin._perform_group_sign = timed_perform
+
+    start = time.perf_counter()
+    replies = [reply async for reply in plugin.sign_all_groups(StubEvent())]
+    elapsed = time.perf_counter() - start
+
+    # 批次内的多次状态保存应被合并，这里把剩余的写出去再统计
+    save_start = time.perf_counter()
+    for _ in range(100):
+        plugin._save_config()
+    save_calls_elapsed = time.perf_counter() - save_start
+    await plugin.terminate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if server:
+        await server.stop()
+
+    return {
+        "groups": groups,
+        "transport": args.transport,
+        "seconds": round(elapsed, 3),
+        "throughput": round(groups / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "success": plugin.sign_statistics["success_count"],
+        "failed": plugin.sign_statistics["fail_count"],
+        "rate_limited": behavior.rate_limited,
+        "calls": dict(behavior.calls),
+        "fallback_sends": len(context.sent),
+        "document_writes": writes.documents,
+        "history_appends": writes.history_appends,
+        "save_config_100_calls_ms": round(save_calls_elapsed * 1000, 2),
+        "peak_traced_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "replies": len(replies),
+    }
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    columns = [
+        ("groups", "群数"), ("seconds", "耗时s"), ("throughput", "群/秒"), ("p50_ms", "p50ms"),
+        ("p99_ms", "p99ms"), ("success", "成功"), ("failed", "失败"), ("rate_limited", "限流"),
+        ("document_writes", "文档写入"), ("history_appends", "历史追加"),
+        ("peak_traced_mb", "峰值MB"), ("max_rss_mb", "RSS MB"),
+    ]
+    rows = [[label for _, label in columns]] + [[str(r[key]) for key, _ in columns] for r in results]
+    widths = [max(len(row[i]) for row in rows) + 2 for i in range(len(columns))]
+    return "\n".join("".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+async def main(args):
+    module = load_plugin_module()
+    sizes = [int(size) for size in args.groups.split(",")]
+    results = []
+    async with ClientSession(connector=TCPConnector(limit=max(10, args.concurrency))) as session:
+        for size in sizes:
+            result = await run_case(module, size, args, session)
+            results.append(result)
+            print(f"完成 {size} 个群: {result['throughput']} 群/秒", file=sys.stderr)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_table(results))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QQ群打卡插件压测")
+    parser.add_argument("--groups", default="10,1000,10000", help="逗号分隔的群数量")
+    parser.add_argument("--transport", choices=("inproc", "http"), default="inproc",
+                        help="inproc 直接调用模拟接口，http 通过本地模拟 OneBot HTTP 服务端")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟接口平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="打卡接口随机失败比例")
+    parser.add_argument("--server-rate-limit", type=float, default=0.0, help="服务端每秒允许的请求数，0 不限流")
+    parser.add_argument("--unsupported", action="store_true", help="set_group_sign 不可用，全部走回退路径")
+    parser.add_argument("--concurrency", type=int, default=50, help="插件打卡并发上限")
+    parser.add_argument("--rate", type=float, default=0.0, help="插件打卡速率限制，0 不限速")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json", help="存储后端")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,158 @@
+"""模拟 OneBot v11 / NapCat 实现，用于压测
+
+- FakeOneBotServer: 基于 aiohttp 的 HTTP 服务端，POST /<action> 返回 OneBot 格式的响应
+- OneBotHttpApi: 调用上述服务端的客户端，接口与 bot.api.call_action 一致
+- FakeBotApi: 进程内模拟，不经过网络，用于测量插件自身开销
+
+三者共用 ServerBehavior 描述的延迟、错误率和限流规则。
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import ClientSession, web
+
+
+class ActionFailed(Exception):
+    """与 aiocqhttp.ActionFailed 一致，带 retcode 属性"""
+
+    def __init__(self, retcode: int, message: str = ""):
+        super().__init__(f"ActionFailed(retcode={retcode}, message={message})")
+        self.retcode = retcode
+
+
+class ServerBehavior:
+    """模拟服务端行为
+
+    latency: 平均延迟（秒），实际延迟在 [latency*(1-jitter), latency*(1+jitter)] 内均匀分布
+    error_rate: set_group_sign / send_group_msg 随机失败的比例
+    rate_limit: 每秒允许的请求数，超出返回 retcode 429，0 表示不限流
+    unsupported: set_group_sign 总是返回不支持，用于测量回退路径
+    """
+
+    def __init__(
+        self,
+        groups: int = 10,
+        latency: float = 0.02,
+        jitter: float = 0.5,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        unsupported: bool = False,
+        seed: Optional[int] = None,
+    ):
+        self.group_ids = [100000000 + i for i in range(groups)]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.unsupported = unsupported
+        self.random = random.Random(seed)
+        self.calls: Dict[str, int] = {}
+        self.rate_limited = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def _limited(self) -> bool:
+        if self.rate_limit <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    async def handle(self, action: str, params: Dict[str, Any]) -> Any:
+        """执行一次模拟调用，成功返回 data，失败抛出 ActionFailed"""
+        self.calls[action] = self.calls.get(action, 0) + 1
+        spread = self.latency * self.jitter
+        await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-spread, spread)))
+
+        if action == "get_group_list":
+            return [{"group_id": gid, "group_name": f"群{gid}"} for gid in self.group_ids]
+        if action in ("get_status", "get_login_info"):
+            return {"online": True, "good": True, "user_id": 10000}
+        if self._limited():
+            self.rate_limited += 1
+            raise ActionFailed(429, "rate limit exceeded")
+        if action == "set_group_sign" and self.unsupported:
+            raise ActionFailed(1404, "action not supported")
+        if self.random.random() < self.error_rate:
+            raise ActionFailed(100, "internal error")
+        return None
+
+
+class FakeBotApi:
+    """进程内的 bot.api，直接调用 ServerBehavior"""
+
+    def __init__(self, behavior: ServerBehavior):
+        self.behavior = behavior
+
+    async def call_action(self, action: str, **params) -> Any:
+        params.pop("self_id", None)
+        return await self.behavior.handle(action, params)
+
+
+class FakeBot:
+    def __init__(self, api):
+        self.api = api
+
+
+class FakeOneBotServer:
+    """OneBot v11 HTTP API 服务端：POST /<action>，JSON 参数"""
+
+    def __init__(self, behavior: ServerBehavior, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        action = request.match_info["action"]
+        params = await request.json() if request.can_read_body else {}
+        try:
+            data = await self.behavior.handle(action, params)
+        except ActionFailed as e:
+            return web.json_response({"status": "failed", "retcode": e.retcode, "data": None, "message": str(e)})
+        return web.json_response({"status": "ok", "retcode": 0, "data": data})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/{action}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class OneBotHttpApi:
+    """OneBot HTTP API 客户端，复用一个连接池"""
+
+    def __init__(self, url: str, session: ClientSession):
+        self.url = url.rstrip("/")
+        self.session = session
+
+    async def call_action(self, action: str, **params) -> Any:
+        params.pop("self_id", None)
+        async with self.session.post(f"{self.url}/{action}", json=params) as resp:
+            payload = await resp.json()
+        if payload.get("status") != "ok":
+            raise ActionFailed(payload.get("retcode", -1), payload.get("message", ""))
+        return payload.get("data")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
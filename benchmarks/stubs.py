@@ -0,0 +1,52 @@
+"""AstrBot 运行时对象的最小替身：Context、配置和消息事件"""
+import asyncio
+from typing import Any, List, Tuple
+
+
+class StubConfig(dict):
+    """AstrBotConfig 替身，save_config 只计数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saves = 0
+
+    def save_config(self):
+        self.saves += 1
+
+
+class StubContext:
+    """Context 替身，记录 send_message 发送的消息"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: List[Tuple[str, Any]] = []
+
+    async def send_message(self, session: str, message_chain: Any):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((session, message_chain))
+        return True
+
+
+class StubEvent:
+    """AstrMessageEvent 替身，chain_result 返回拼接后的文本"""
+
+    def __init__(self, message_str: str = "", group_id: str = "", self_id: str = "10000"):
+        self.message_str = message_str
+        self._group_id = group_id
+        self._self_id = self_id
+
+    def get_group_id(self) -> str:
+        return self._group_id
+
+    def get_self_id(self) -> str:
+        return self._self_id
+
+    def get_platform_name(self) -> str:
+        return "aiocqhttp"
+
+    def chain_result(self, chain) -> str:
+        return "".join(getattr(component, "text", str(component)) for component in chain)
+
+    def plain_result(self, text: str) -> str:
+        return text
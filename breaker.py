@@ -0,0 +1,153 @@
+import time
+from typing import Dict, Optional
+
+from astrbot.api import logger
+
+from .retry_queue import PERMANENT, classify_error
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_LABELS = {CLOSED: "正常", OPEN: "熔断", HALF_OPEN: "半开"}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时拒绝调用"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 已熔断，{retry_in:.0f} 秒后重试")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """单个平台接口的熔断器
+
+    连续 failure_threshold 次失败后打开，期间直接拒绝调用；
+    recovery_timeout 秒后进入半开状态，放行最多 half_open_max_calls 个探测调用，
+    探测成功则关闭，失败则重新打开。failure_threshold <= 0 表示不启用。
+    单群调用超时另行计数（record_timeout），不算作接口失败。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 60.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = int(failure_threshold)
+        self.recovery_timeout = max(1.0, float(recovery_timeout))
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.last_error = ""
+        self.timeouts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"熔断器 {self.name} 进入半开状态，开始探测")
+        return self._state
+
+    def retry_in(self) -> float:
+        """距离进入半开状态的剩余秒数"""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """是否允许本次调用，半开状态下只放行有限的探测调用"""
+        if not self.enabled:
+            return True
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        return False
+
+    def check(self):
+        """不允许调用时抛出 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self):
+        if self._state != CLOSED:
+            logger.info(f"熔断器 {self.name} 探测成功，恢复正常")
+        self._state = CLOSED
+        self._failures = 0
+        self._probes = 0
+
+    def record_failure(self, error: Exception):
+        """记录一次失败；群级别的永久错误说明接口本身可用，不计入失败"""
+        if not self.enabled:
+            return
+        if classify_error(error) == PERMANENT:
+            self.record_success()
+            return
+        self.last_error = str(error)[:200]
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                logger.warning(
+                    f"熔断器 {self.name} 打开: 连续失败 {self._failures} 次，"
+                    f"{self.recovery_timeout:.0f} 秒内跳过该接口 ({self.last_error})"
+                )
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._probes = 0
+
+    def record_timeout(self):
+        """记录一次单群调用超时
+
+        超时时间按该群的历史耗时估计，超时说明这个群慢，不代表接口不可用，
+        因此不计入连续失败，也不清零；半开状态下超时的探测不下结论，放行下一个探测
+        """
+        self.timeouts += 1
+        if self._state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def describe(self) -> str:
+        state = self.state
+        text = f"{self.name}={STATE_LABELS[state]}"
+        if state == OPEN:
+            text += f"({self.retry_in():.0f}s)"
+        if self.timeouts:
+            text += f"[单群超时 {self.timeouts}]"
+        return text
+
+
+class BreakerRegistry:
+    """按接口名管理熔断器"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(
+                name, self.failure_threshold, self.recovery_timeout
+            )
+        return breaker
+
+    def summary(self) -> Optional[str]:
+        """状态摘要，未启用时返回 None"""
+        if self.failure_threshold <= 0:
+            return None
+        return ", ".join(b.describe() for b in self._breakers.values()) or "暂无调用"
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from astrbot.api import logger
+
+from .storage import write_atomic
+
+
+class BatchCheckpoint:
+    """单个打卡批次的检查点
+
+    日志首行为批次信息（JSON），之后每完成一个群追加一行群号，只追加不重写。
+    完成的群先缓冲，每 FLUSH_EVERY 个在线程中追加一次；进程异常退出时最多重做这么多个群，
+    今天已打卡的群在继续时会被跳过。
+    批次正常结束时删除日志；中途取消或进程退出时保留，下次启动后继续剩余的群。
+    """
+
+    FLUSH_EVERY = 100
+
+    def __init__(self, path: Path, header: Dict[str, Any], done: Optional[Set[str]] = None):
+        self.path = path
+        self.header = header
+        self.done: Set[str] = done or set()
+        self._file = None
+        self._buffer: List[str] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def id(self) -> str:
+        return self.header["id"]
+
+    @property
+    def kind(self) -> str:
+        return self.header.get("kind", "manual")
+
+    @property
+    def slot(self) -> Optional[str]:
+        return self.header.get("slot")
+
+    @property
+    def target(self) -> Optional[str]:
+        return self.header.get("target")
+
+    @property
+    def day(self) -> int:
+        return self.header.get("day", 0)
+
+    @property
+    def groups(self) -> List[str]:
+        return self.header["groups"]
+
+    def remaining(self) -> List[str]:
+        return [group_id for group_id in self.groups if group_id not in self.done]
+
+    def _write(self, lines: List[str]):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write("".join(f"{group_id}\n" for group_id in lines))
+        self._file.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _delete(self):
+        self._close_file()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def mark_done(self, group_id: str):
+        """记录一个已完成的群，缓冲满 FLUSH_EVERY 个时追加到日志（只写入系统缓冲，不做 fsync）
+
+        done 只包含从日志加载的群，本次运行中完成的群不再放进内存集合；
+        批次内每个群只会完成一次，加载时按集合去重
+        """
+        self._buffer.append(str(group_id))
+        if len(self._buffer) >= self.FLUSH_EVERY:
+            await self.flush()
+
+    async def flush(self):
+        """把缓冲的群号追加到日志"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write, lines)
+
+    async def close(self):
+        """写入缓冲并关闭日志但保留，用于之后继续"""
+        await self.flush()
+        async with self._lock:
+            await asyncio.to_thread(self._close_file)
+
+    async def complete(self):
+        """批次完成，丢弃缓冲并删除日志"""
+        async with self._lock:
+            self._buffer = []
+            await asyncio.to_thread(self._delete)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BatchCheckpoint"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                # 进程中断时最后一行可能不完整，按完整行读取
+                done = {line.strip() for line in f if line.endswith("\n") and line.strip()}
+        except (OSError, ValueError) as e:
+            logger.error(f"读取打卡批次检查点 {path.name} 失败: {e}")
+            return None
+        if not isinstance(header, dict) or not isinstance(header.get("groups"), list):
+            return None
+        return cls(path, header, done)
+
+
+class CheckpointStore:
+    """打卡批次检查点目录，每个批次一个日志文件"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._active: Dict[str, BatchCheckpoint] = {}
+
+    async def start(
+        self,
+        groups: List[str],
+        day: int,
+        kind: str = "manual",
+        slot: Optional[str] = None,
+        target: Optional[str] = None,
+    ) -> BatchCheckpoint:
+        """为新批次创建检查点，首行写入批次信息"""
+        header = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "slot": slot,
+            "target": target,
+            "day": day,
+            "created": round(time.time(), 3),
+            "groups": [str(gid) for gid in groups],
+        }
+        path = self.directory / f"{header['id']}.log"
+        checkpoint = BatchCheckpoint(path, header)
+        # 先登记为执行中，线程中创建文件期间 claim_pending 不会把它当作中断的批次
+        self._active[checkpoint.id] = checkpoint
+        await asyncio.to_thread(self._create, path, header)
+        return checkpoint
+
+    def _create(self, path: Path, header: Dict[str, Any]):
+        # 原子替换，并发的扫描不会读到只写了一半的首行
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps(header, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+    async def release(self, checkpoint: BatchCheckpoint, completed: bool):
+        self._active.pop(checkpoint.id, None)
+        if completed:
+            await checkpoint.complete()
+        else:
+            await checkpoint.close()
+
+    async def claim_pending(self, today: int) -> List[BatchCheckpoint]:
+        """取出未完成且不在执行中的今天的批次并标记为执行中
+
+        较早日期的批次已由后续打卡覆盖，直接删除。目录扫描和读取在线程中执行
+        """
+        scanned = await asyncio.to_thread(self._scan, today, set(self._active))
+        # 扫描期间开始的批次不算中断
+        result = [checkpoint for checkpoint in scanned if checkpoint.id not in self._active]
+        for checkpoint in result:
+            self._active[checkpoint.id] = checkpoint
+        return result
+
+    def _scan(self, today: int, active: Set[str]) -> List[BatchCheckpoint]:
+        if not self.directory.exists():
+            return []
+        result = []
+        for path in sorted(self.directory.glob("*.log"), key=lambda p: p.stat().st_mtime):
+            if path.stem in active:
+                continue
+            checkpoint = BatchCheckpoint.load(path)
+            if checkpoint is None:
+                path.replace(path.with_suffix(".corrupted"))
+                continue
+            if checkpoint.day != today and checkpoint.remaining():
+                logger.info(f"丢弃过期的打卡批次检查点 {path.name}: 剩余 {len(checkpoint.remaining())} 个群")
+            if checkpoint.day != today or not checkpoint.remaining():
+                checkpoint._delete()
+                continue
+            result.append(checkpoint)
+        return result
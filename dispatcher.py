@@ -0,0 +1,321 @@
+import asyncio
+import heapq
+import time
+from collections import abc, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from astrbot.api import logger
+
+# 优先级，数字越小越先打卡
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {"高": PRIORITY_HIGH, "普通": PRIORITY_NORMAL, "低": PRIORITY_LOW}
+PRIORITY_LABELS = {value: name for name, value in PRIORITY_NAMES.items()}
+
+
+class SubsetView(abc.Sequence):
+    """按下标列表引用另一个序列的只读视图，不复制元素"""
+
+    __slots__ = ("_base", "_indices")
+
+    def __init__(self, base: Sequence[Any], indices: Sequence[int]):
+        self._base = base
+        self._indices = indices
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._base[i] for i in self._indices[position]]
+        return self._base[self._indices[position]]
+
+
+class ReadyQueue:
+    """按就绪顺序取任务的下标：偏移时间已到的任务中优先级数字小的先取，同级按偏移和输入顺序
+
+    偏移未到的任务不占用取任务的工作者，后到期的高优先级任务不会挡住已到期的普通任务。
+    时间为相对批次开始的秒数，由调用方传入，实际调度和模拟打卡共用。
+    """
+
+    def __init__(
+        self,
+        count: int,
+        offsets: Optional[Sequence[float]] = None,
+        priorities: Optional[Sequence[int]] = None,
+    ):
+        self._count = count
+        self._next = 0
+        self._priorities = priorities
+        # 没有偏移和优先级时按输入顺序，不建堆
+        self._ordered = not offsets and not priorities
+        self._waiting: List[Tuple[float, int]] = []
+        self._ready: List[Tuple[int, float, int]] = []
+        if offsets:
+            self._waiting = [(offsets[i], i) for i in range(count)]
+            heapq.heapify(self._waiting)
+        elif priorities:
+            self._ready = [(priorities[i], 0.0, i) for i in range(count)]
+            heapq.heapify(self._ready)
+
+    def __len__(self) -> int:
+        if self._ordered:
+            return self._count - self._next
+        return len(self._waiting) + len(self._ready)
+
+    def _promote(self, now: float):
+        while self._waiting and self._waiting[0][0] <= now:
+            offset, index = heapq.heappop(self._waiting)
+            priority = self._priorities[index] if self._priorities else PRIORITY_NORMAL
+            heapq.heappush(self._ready, (priority, offset, index))
+
+    def pop(self, now: float) -> Optional[int]:
+        """取出 now 时已就绪的下一个任务，没有就绪任务时返回 None"""
+        if self._ordered:
+            if self._next >= self._count:
+                return None
+            self._next += 1
+            return self._next - 1
+        self._promote(now)
+        return heapq.heappop(self._ready)[2] if self._ready else None
+
+    def ready_at(self, now: float) -> Optional[float]:
+        """不早于 now 的最早可以取到任务的时间，已全部取完返回 None"""
+        if not len(self):
+            return None
+        if self._ordered or self._ready:
+            return now
+        return max(now, self._waiting[0][0])
+
+
+class BudgetExceeded(Exception):
+    """超出本次打卡的时间预算，任务未执行"""
+
+    def __init__(self):
+        super().__init__("超出本次打卡时间预算")
+
+
+class TokenMeter:
+    """不依赖时钟的令牌桶计算，时间由调用方传入；rate <= 0 表示不限速
+
+    请求按到达顺序预约令牌，TokenBucket 用真实时钟驱动，模拟打卡用虚拟时钟驱动。
+    """
+
+    def __init__(self, rate: float, burst: int, now: float = 0.0):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = now
+        self.min_rate = self.rate
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            if self.rate > 0:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def set_rate(self, rate: float, now: float):
+        """调整速率，已积累的令牌保留"""
+        self._refill(now)
+        self.rate = float(rate)
+        self.min_rate = min(self.min_rate, self.rate)
+
+    def reserve(self, now: float) -> float:
+        """在 now 请求一个令牌，返回拿到令牌的时间"""
+        if self.rate <= 0:
+            return now
+        now = max(now, self._updated)
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return now
+        granted = now + (1 - self._tokens) / self.rate
+        self._tokens = 0.0
+        self._updated = granted
+        return granted
+
+
+class TokenBucket:
+    """令牌桶限速器，rate <= 0 表示不限速"""
+
+    def __init__(self, rate: float, burst: int):
+        self.meter = TokenMeter(rate, burst, time.monotonic())
+
+    @property
+    def rate(self) -> float:
+        return self.meter.rate
+
+    def set_rate(self, rate: float):
+        """调整速率，已积累的令牌保留"""
+        self.meter.set_rate(rate, time.monotonic())
+
+    async def acquire(self):
+        """取走一个令牌，不足时等待补充"""
+        now = time.monotonic()
+        delay = self.meter.reserve(now) - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AdaptiveRate:
+    """失败率自适应退避策略，只做计算，调度器和模拟打卡共用
+
+    窗口内失败率超过阈值时速率减半（不低于配置速率的 1/10）并给出一段递增的退避暂停，
+    连续 MIN_SAMPLES 次成功后每次恢复配置速率的 10%。
+    """
+
+    MIN_SAMPLES = 10
+    MAX_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        base_rate: float,
+        adaptive: bool = True,
+        failure_threshold: float = 0.2,
+        window: int = 50,
+    ):
+        self.base_rate = float(base_rate)
+        self.enabled = adaptive and self.base_rate > 0
+        self.min_rate = self.base_rate / 10
+        self.failure_threshold = failure_threshold
+        self.backoff = 0.0
+        # 最近一次触发退避时窗口内的 (失败数, 样本数)
+        self.last_window = (0, 0)
+        self._outcomes: deque = deque(maxlen=max(self.MIN_SAMPLES, int(window)))
+
+    def record(self, ok: bool, rate: float) -> Optional[Tuple[float, float]]:
+        """记录一次调用结果，需要调整时返回 (新速率, 暂停秒数)，否则返回 None"""
+        if not self.enabled:
+            return None
+        self._outcomes.append(ok)
+        if len(self._outcomes) < self.MIN_SAMPLES:
+            return None
+
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.failure_threshold:
+            self.last_window = (failures, len(self._outcomes))
+            self.backoff = min(self.MAX_BACKOFF, self.backoff * 2 if self.backoff else 1.0)
+            self._outcomes.clear()
+            return max(self.min_rate, rate / 2), self.backoff
+        if failures == 0:
+            self.backoff = 0.0
+            self._outcomes.clear()
+            if rate < self.base_rate:
+                return min(self.base_rate, rate + self.base_rate * 0.1), 0.0
+        return None
+
+
+class SignDispatcher:
+    """打卡调度器：并发上限 + 令牌桶限速 + 失败率自适应退避（见 AdaptiveRate）"""
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        rate: float = 5.0,
+        burst: int = 10,
+        adaptive: bool = True,
+        failure_threshold: float = 0.2,
+        window: int = 50,
+    ):
+        self.concurrency = max(1, int(concurrency))
+        self.base_rate = float(rate)
+        self.bucket = TokenBucket(rate, burst)
+        self.policy = AdaptiveRate(rate, adaptive, failure_threshold, window)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._pause_until = 0.0
+
+    @property
+    def current_rate(self) -> float:
+        return self.bucket.rate
+
+    def _record(self, ok: bool):
+        """记录一次调用结果并按失败率调整速率"""
+        change = self.policy.record(ok, self.bucket.rate)
+        if change is None:
+            return
+        new_rate, pause = change
+        self.bucket.set_rate(new_rate)
+        if pause:
+            failures, total = self.policy.last_window
+            self._pause_until = time.monotonic() + pause
+            logger.warning(
+                f"打卡失败率过高 ({failures}/{total})，"
+                f"速率降至 {new_rate:.2f}/s，暂停 {pause:.1f}s"
+            )
+        else:
+            logger.info(f"打卡成功率恢复，速率升至 {new_rate:.2f}/s")
+
+    async def submit(self, worker: Callable[[Any], Awaitable[Any]], item: Any) -> Any:
+        """在并发与速率限制下执行单个任务"""
+        async with self._semaphore:
+            delay = self._pause_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+            try:
+                result = await worker(item)
+            except Exception:
+                self._record(False)
+                raise
+            self._record(not isinstance(result, dict) or result.get("success", False))
+            return result
+
+    async def iter_results(
+        self,
+        items: Iterable[Any],
+        worker: Callable[[Any], Awaitable[Any]],
+        offsets: Optional[Sequence[float]] = None,
+        priorities: Optional[Sequence[int]] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """批量执行，按完成顺序逐个产出 (下标, 结果)，异常作为结果返回
+
+        offsets 为每个任务相对开始时间的最早执行秒数。
+        priorities 为每个任务的优先级，偏移已到的任务中数字小的先执行，同级按 offsets 和输入顺序；
+        空闲的工作者等待下一个任务到期时不占用任何任务，见 ReadyQueue。
+        deadline 为 time.monotonic() 时间，超过后不再开始高优先级以外的任务，
+        这些任务以 BudgetExceeded 作为结果返回。
+        调用方提前结束迭代时，未完成的任务会被取消。
+        items 已是序列时直接按下标访问，不复制。
+        """
+        if not isinstance(items, abc.Sequence):
+            items = list(items)
+        queue = ReadyQueue(len(items), offsets, priorities)
+        finished: asyncio.Queue = asyncio.Queue()
+        start = time.monotonic()
+
+        def _over_budget(index: int) -> bool:
+            if deadline is None or time.monotonic() < deadline:
+                return False
+            return (priorities[index] if priorities else PRIORITY_NORMAL) > PRIORITY_HIGH
+
+        async def _worker_loop():
+            while True:
+                elapsed = time.monotonic() - start
+                index = queue.pop(elapsed)
+                if index is None:
+                    ready_at = queue.ready_at(elapsed)
+                    if ready_at is None:
+                        return
+                    await asyncio.sleep(ready_at - elapsed)
+                    continue
+                if _over_budget(index):
+                    finished.put_nowait((index, BudgetExceeded()))
+                    continue
+                try:
+                    result = await self.submit(worker, items[index])
+                except Exception as e:
+                    result = e
+                finished.put_nowait((index, result))
+
+        workers = [
+            asyncio.create_task(_worker_loop()) for _ in range(min(self.concurrency, len(items)))
+        ]
+        try:
+            for _ in range(len(items)):
+                yield await finished.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
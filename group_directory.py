@@ -0,0 +1,114 @@
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, AbstractSet, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from astrbot.api import logger
+
+
+def pack_group_ids(group_ids: Sequence[str]) -> Union[array, List[str]]:
+    """把群号存为 array('q')，每个群 8 字节；含非数字群号时保留字符串列表"""
+    try:
+        return array('q', (int(gid) for gid in group_ids))
+    except (TypeError, ValueError, OverflowError):
+        return [str(gid) for gid in group_ids]
+
+
+class GroupDirectory:
+    """群列表缓存：TTL 内直接复用，过期后重新拉取；拉取失败时继续使用旧列表"""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = max(0.0, float(ttl))
+        # 群号紧凑存储，见 pack_group_ids；_lookup 为排好序的副本（非数字群号时为集合），用于成员判断
+        self._groups: Union[array, List[str]] = array('q')
+        self._lookup: Union[array, AbstractSet[str]] = array('q')
+        # groups 属性生成的字符串列表，下次刷新前复用
+        self._materialized: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.on_change: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(gid) for gid in self._groups)
+
+    def __contains__(self, group_id: Any) -> bool:
+        if not isinstance(self._lookup, array):
+            return str(group_id) in self._lookup
+        try:
+            value = int(group_id)
+        except (TypeError, ValueError):
+            return False
+        index = bisect_left(self._lookup, value)
+        return index < len(self._lookup) and self._lookup[index] == value
+
+    @property
+    def groups(self) -> List[str]:
+        """群号字符串列表（缓存到下次刷新，调用方不要修改）"""
+        if self._materialized is None:
+            self._materialized = [str(gid) for gid in self._groups]
+        return self._materialized
+
+    def _set_groups(self, packed: Union[array, List[str]]):
+        self._groups = packed
+        self._lookup = array('q', sorted(packed)) if isinstance(packed, array) else frozenset(packed)
+        self._materialized = None
+
+    @property
+    def age(self) -> Optional[float]:
+        """距离上次成功拉取的秒数，从未拉取过返回 None"""
+        return time.time() - self._fetched_at if self._fetched_at else None
+
+    @property
+    def is_fresh(self) -> bool:
+        return bool(self._groups) and self.age is not None and self.age < self.ttl
+
+    async def refresh(self, fetch: Callable[[], Awaitable[List[str]]]) -> bool:
+        """拉取最新群列表并记录入群/退群变化，失败时保留旧数据"""
+        async with self._lock:
+            try:
+                groups = await fetch()
+            except Exception as e:
+                if self._groups:
+                    logger.warning(f"刷新群列表失败: {e}，继续使用 {self.age:.0f} 秒前的缓存 ({len(self._groups)} 个群)")
+                else:
+                    logger.error(f"刷新群列表失败: {e}")
+                return False
+
+            packed = pack_group_ids(groups)
+            if self._groups:
+                previous, current = self._groups, packed
+                if type(previous) is not type(current):
+                    previous, current = [str(g) for g in previous], [str(g) for g in current]
+                old, new = set(previous), set(current)
+                joined = [str(g) for g in current if g not in old]
+                left = [str(g) for g in previous if g not in new]
+                if joined:
+                    logger.info(f"新加入 {len(joined)} 个群: {', '.join(joined[:20])}{' ...' if len(joined) > 20 else ''}")
+                if left:
+                    logger.info(f"已退出 {len(left)} 个群: {', '.join(left[:20])}{' ...' if len(left) > 20 else ''}")
+
+            self._set_groups(packed)
+            self._fetched_at = time.time()
+            if self.on_change:
+                self.on_change()
+            return True
+
+    async def get(self, fetch: Callable[[], Awaitable[List[str]]]) -> List[str]:
+        """返回群列表（不要修改），缓存过期时先尝试刷新"""
+        if not self.is_fresh:
+            await self.refresh(fetch)
+        return self.groups
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"groups": self.groups, "fetched_at": self._fetched_at}
+
+    def restore(self, data: Optional[Dict[str, Any]]):
+        """恢复上次保存的群列表，作为拉取失败时的后备"""
+        if not isinstance(data, dict):
+            return
+        self._set_groups(pack_group_ids(data.get("groups", [])))
+        self._fetched_at = float(data.get("fetched_at", 0))
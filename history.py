@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, tzinfo
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+from .storage import write_atomic
+
+# 打卡路径
+PATH_API = "api"
+PATH_FALLBACK = "fallback"
+
+ROLLUP_RETENTION_DAYS = 90
+
+
+def day_of(timestamp: float, tz: tzinfo) -> str:
+    return datetime.fromtimestamp(timestamp, tz).strftime("%Y-%m-%d")
+
+
+def find_failing_groups(daily: Dict[str, Dict[str, List[int]]], days: int) -> List[str]:
+    """在按天统计 {day: {group: [ok, fail]}} 中找出最近 days 天每天都失败且没有成功的群"""
+    recent_days = sorted(daily)[-days:]
+    if len(recent_days) < days:
+        return []
+    candidates = None
+    for day in recent_days:
+        failed = {gid for gid, (ok, fail) in daily[day].items() if fail and not ok}
+        candidates = failed if candidates is None else candidates & failed
+    return sorted(candidates or [])
+
+
+class JsonlHistorySink:
+    """JSON 后端的历史存储：明细追加到 JSONL，压缩后的按天汇总存为 JSON
+
+    单行字段: g=群号 t=时间戳 p=路径(api/fallback) l=耗时毫秒 e=错误分类(成功为 null)
+    """
+
+    def __init__(self, log_path: Path, rollup_path: Path):
+        self.log_path = log_path
+        self.rollup_path = rollup_path
+
+    def append(self, records: List[Dict[str, Any]], tz: tzinfo):
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records))
+
+    def load_rollups(self) -> Dict[str, Any]:
+        if not os.path.exists(self.rollup_path):
+            return {}
+        try:
+            with open(self.rollup_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"读取打卡历史汇总失败: {e}")
+            return {}
+
+    def iter_records(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line, json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def compact(self, cutoff: float, tz: tzinfo) -> int:
+        """把 cutoff 之前的记录汇总到按天统计，并重写日志只保留近期记录"""
+        rollups = self.load_rollups()
+        kept: List[str] = []
+        compacted = 0
+        for line, record in self.iter_records():
+            if record.get("t", 0) >= cutoff:
+                kept.append(line)
+                continue
+
+            day = rollups.setdefault(day_of(record["t"], tz), {})
+            stats = day.setdefault(record["g"], {"ok": 0, "fail": 0, "latency_ms": 0.0, "errors": {}})
+            if record.get("e"):
+                stats["fail"] += 1
+                stats["errors"][record["e"]] = stats["errors"].get(record["e"], 0) + 1
+            else:
+                stats["ok"] += 1
+            stats["latency_ms"] = round(stats["latency_ms"] + record.get("l", 0), 1)
+            compacted += 1
+
+        if compacted == 0:
+            return 0
+
+        oldest_day = day_of(cutoff - ROLLUP_RETENTION_DAYS * 86400, tz)
+        rollups = {day: groups for day, groups in rollups.items() if day >= oldest_day}
+        write_atomic(self.rollup_path, json.dumps(rollups, ensure_ascii=False, separators=(',', ':')))
+        write_atomic(self.log_path, "".join(f"{line}\n" for line in kept))
+        return compacted
+
+    def failing_groups(self, days: int, tz: tzinfo) -> List[str]:
+        """连续 days 天打卡失败的群（需要读取汇总和明细）"""
+        daily: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        for day, groups in self.load_rollups().items():
+            for gid, stats in groups.items():
+                daily[day][gid] = [stats.get("ok", 0), stats.get("fail", 0)]
+        for _, record in self.iter_records():
+            counts = daily[day_of(record["t"], tz)].setdefault(record["g"], [0, 0])
+            counts[1 if record.get("e") else 0] += 1
+        return find_failing_groups(daily, days)
+
+    def latency_profile(self) -> Dict[str, Tuple[int, int, float]]:
+        """每个群的 (成功次数, 失败次数, 总耗时毫秒)，包含汇总和明细"""
+        profile: Dict[str, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+        for groups in self.load_rollups().values():
+            for gid, stats in groups.items():
+                totals = profile[gid]
+                totals[0] += stats.get("ok", 0)
+                totals[1] += stats.get("fail", 0)
+                totals[2] += stats.get("latency_ms", 0.0)
+        for _, record in self.iter_records():
+            totals = profile[record["g"]]
+            totals[1 if record.get("e") else 0] += 1
+            totals[2] += record.get("l", 0)
+        return {gid: tuple(totals) for gid, totals in profile.items()}
+
+    def close(self):
+        pass
+
+
+class SignHistory:
+    """打卡历史：每次打卡尝试一条记录，缓冲后批量追加到存储后端，定期压缩旧记录"""
+
+    def __init__(self, sink, tz: tzinfo, retention_days: int = 7, flush_interval: float = 2.0):
+        self.sink = sink
+        self.tz = tz
+        self.retention_days = max(1, int(retention_days))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_handle: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def record(
+        self,
+        group_id: str,
+        path: Optional[str],
+        latency: float,
+        error_class: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ):
+        """记录一次打卡尝试，写入缓冲区后批量追加"""
+        self._buffer.append({
+            "g": str(group_id),
+            "t": round(timestamp if timestamp is not None else time.time(), 3),
+            "p": path,
+            "l": round(latency * 1000, 1),
+            "e": error_class,
+        })
+        if self._flush_handle is None or self._flush_handle.done():
+            self._flush_handle = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """把缓冲区追加到存储后端"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self.sink.append, records, self.tz)
+            except Exception as e:
+                logger.error(f"写入打卡历史失败: {e}")
+                self._buffer[:0] = records
+
+    async def compact(self) -> int:
+        """压缩超出保留天数的记录，返回被汇总的记录数"""
+        await self.flush()
+        today = datetime.now(self.tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = (today - timedelta(days=self.retention_days)).timestamp()
+        async with self._lock:
+            try:
+                compacted = await asyncio.to_thread(self.sink.compact, cutoff, self.tz)
+            except Exception as e:
+                logger.error(f"压缩打卡历史失败: {e}", exc_info=True)
+                return 0
+        if compacted:
+            logger.info(f"打卡历史压缩完成: {compacted} 条记录已汇总为按天统计")
+        return compacted
+
+    async def failing_groups(self, days: int) -> List[str]:
+        """查询连续 days 天打卡失败的群"""
+        await self.flush()
+        return await asyncio.to_thread(self.sink.failing_groups, days, self.tz)
+
+    async def latency_profile(self) -> Dict[str, Tuple[int, int, float]]:
+        """按群统计的打卡次数和耗时，用于模拟打卡"""
+        await self.flush()
+        return await asyncio.to_thread(self.sink.latency_profile)
+
+    async def close(self):
+        """取消延迟写入并写入剩余缓冲"""
+        if self._flush_handle and not self._flush_handle.done():
+            self._flush_handle.cancel()
+            try:
+                await self._flush_handle
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
@@ -0,0 +1,109 @@
+import math
+from array import array
+from typing import Any, Dict, Optional
+
+from astrbot.api import logger
+
+
+class LatencyTracker:
+    """按群统计打卡接口耗时：指数加权均值（EWMA）和方差，估算 p95 并据此给出单次调用超时
+
+    p95 按正态近似为 均值 + 1.645 * 标准差。样本不足 MIN_SAMPLES 时使用默认超时。
+    均值超过 slow_threshold 或连续超时 2 次的群视为慢群。
+    每个群的统计按下标存放在几个定长数组中，群号到下标的映射为唯一的字典。
+    """
+
+    MIN_SAMPLES = 3
+    TIMEOUT_MULTIPLIER = 3.0
+
+    def __init__(
+        self,
+        default_timeout: float = 15.0,
+        min_timeout: float = 2.0,
+        slow_threshold: float = 3.0,
+        alpha: float = 0.3,
+    ):
+        self.default_timeout = max(0.1, float(default_timeout))
+        self.min_timeout = min(self.default_timeout, max(0.1, float(min_timeout)))
+        self.slow_threshold = float(slow_threshold)
+        self.alpha = alpha
+        self._index: Dict[str, int] = {}
+        self._mean = array('d')
+        self._var = array('d')
+        self._count = array('I')
+        # 连续超时次数，封顶 255
+        self._timeouts = array('B')
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _add(self, group_id: str, mean: float, var: float = 0.0, count: int = 0, timeouts: int = 0) -> int:
+        index = self._index[group_id] = len(self._mean)
+        self._mean.append(mean)
+        self._var.append(var)
+        self._count.append(min(count, 0xFFFFFFFF))
+        self._timeouts.append(min(timeouts, 255))
+        return index
+
+    def record(self, group_id: str, latency: float, timed_out: bool = False):
+        """记录一次调用耗时，超时按超时时间计入"""
+        index = self._index.get(group_id)
+        if index is None:
+            index = self._add(group_id, latency)
+        else:
+            diff = latency - self._mean[index]
+            increment = self.alpha * diff
+            self._mean[index] += increment
+            self._var[index] = (1 - self.alpha) * (self._var[index] + diff * increment)
+        if self._count[index] < 0xFFFFFFFF:
+            self._count[index] += 1
+        was_slow = self._is_slow(index)
+        self._timeouts[index] = min(255, self._timeouts[index] + 1) if timed_out else 0
+        if not was_slow and self._is_slow(index):
+            logger.info(f"群 {group_id} 打卡耗时偏高（均值 {self._mean[index]:.1f}s），移入慢速通道")
+
+    def p95(self, group_id: str) -> Optional[float]:
+        index = self._index.get(group_id)
+        if index is None or self._count[index] < self.MIN_SAMPLES:
+            return None
+        return self._mean[index] + 1.645 * math.sqrt(max(0.0, self._var[index]))
+
+    def timeout_for(self, group_id: str) -> float:
+        """单次调用的超时秒数：p95 的若干倍，限制在 [min_timeout, default_timeout] 内"""
+        p95 = self.p95(group_id)
+        if p95 is None:
+            return self.default_timeout
+        return min(self.default_timeout, max(self.min_timeout, p95 * self.TIMEOUT_MULTIPLIER))
+
+    def _is_slow(self, index: int) -> bool:
+        if self.slow_threshold <= 0:
+            return False
+        return self._timeouts[index] >= 2 or (
+            self._count[index] >= self.MIN_SAMPLES and self._mean[index] >= self.slow_threshold
+        )
+
+    def is_slow(self, group_id: str) -> bool:
+        index = self._index.get(group_id)
+        return index is not None and self._is_slow(index)
+
+    def slow_count(self) -> int:
+        return sum(1 for index in range(len(self._mean)) if self._is_slow(index))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            gid: [round(self._mean[i], 4), round(self._var[i], 6), self._count[i], self._timeouts[i]]
+            for gid, i in self._index.items()
+        }
+
+    def restore(self, data: Optional[Dict[str, Any]]):
+        if not isinstance(data, dict):
+            return
+        for group_id, values in data.items():
+            group_id = str(group_id)
+            if group_id in self._index:
+                continue
+            try:
+                mean, var, count, timeouts = values
+                self._add(group_id, float(mean), float(var), int(count), int(timeouts))
+            except (TypeError, ValueError):
+                continue
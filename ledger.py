@@ -0,0 +1,50 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from astrbot.api import logger
+
+
+class SignLedger:
+    """每个群最近一次打卡成功的日期，用于跳过当天已打卡的群
+
+    日期使用 date.toordinal() 的整数表示，查询为 O(1)。
+    持久化时按日期分组为 {日期: [群号]}，群号不再重复存储日期。
+    """
+
+    def __init__(self):
+        self._days: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def mark(self, group_id: str, day: int):
+        """记录群在 day 打卡成功"""
+        self._days[str(group_id)] = day
+
+    def signed_on(self, group_id: str, day: int) -> bool:
+        return self._days.get(str(group_id)) == day
+
+    def prune(self, keep_from: int):
+        """丢弃 keep_from 之前的记录，它们不会再影响去重"""
+        self._days = {gid: day for gid, day in self._days.items() if day >= keep_from}
+
+    def to_dict(self) -> Dict[str, Any]:
+        grouped: Dict[int, List[str]] = defaultdict(list)
+        for group_id, day in self._days.items():
+            grouped[day].append(group_id)
+        return {"days": {str(day): groups for day, groups in grouped.items()}}
+
+    def restore(self, data: Optional[Dict[str, Any]]):
+        if not isinstance(data, dict) or not isinstance(data.get("days"), dict):
+            return
+        days: Dict[str, int] = {}
+        for day, groups in data["days"].items():
+            try:
+                ordinal = int(day)
+            except ValueError:
+                continue
+            for group_id in groups or []:
+                days[str(group_id)] = ordinal
+        self._days = days
+        if days:
+            logger.info(f"已恢复 {len(days)} 个群的最近打卡日期")
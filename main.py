@@ -1,29 +1,87 @@
+import time as time_module
+# 模块导入耗时计入启动耗时
+_IMPORT_STARTED = time_module.perf_counter()
+
 from pathlib import Path
 from datetime import datetime, time, timedelta, timezone
-import aiohttp
-import aiofiles
-import json
 import asyncio
-import os
-from typing import List, Optional, Union, Dict, Any
-from urllib.parse import urlparse
+import heapq
+import re
+from array import array
+from typing import List, Optional, Sequence, Set, Tuple, Union, Dict, Any, AsyncIterator
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, StarTools, register
-from astrbot.api.message_components import Plain, At
+from astrbot.api.message_components import Plain
 from astrbot.api import logger
 from astrbot.api import AstrBotConfig
 
+try:
+    from aiohttp import ClientError
+except ImportError:  # aiohttp 由 AstrBot 提供，缺失时按 OSError 判断网络错误
+    ClientError = OSError
+
+from .accounts import BotAccount, shard_groups
+from .breaker import BreakerRegistry, CircuitOpenError
+from .checkpoint import BatchCheckpoint, CheckpointStore
+from .dispatcher import (
+    PRIORITY_LABELS,
+    PRIORITY_NAMES,
+    PRIORITY_NORMAL,
+    BudgetExceeded,
+    SignDispatcher,
+    SubsetView,
+    TokenMeter,
+)
+from .group_directory import GroupDirectory
+from .history import PATH_API, PATH_FALLBACK, SignHistory
+from .latency import LatencyTracker
+from .ledger import SignLedger
+from .metrics import DURATION_BUCKETS, MetricsRegistry
+from .retry_queue import TRANSIENT, RetryQueue, classify_error
+from .scheduler import PrecisionTimer, ScheduleTable, next_occurrence, parse_time_str
+from .storage import (
+    DIRECTORY_DOCUMENT,
+    LATENCY_DOCUMENT,
+    LEDGER_DOCUMENT,
+    RETRY_DOCUMENT,
+    STATE_DOCUMENT,
+    JsonBackend,
+    WriteBehindStore,
+    create_backend,
+    write_atomic,
+)
+from .tally import BatchTally
+from .whitelist import Whitelist, format_preview, parse_group_ids
+
+_IMPORT_SECONDS = time_module.perf_counter() - _IMPORT_STARTED
+
+# 批次执行中每完成多少个群保存一次统计和重试队列
+CHECKPOINT_SAVE_EVERY = 100
+
+# 白名单每页显示的群数，以及增删回复中预览的群数
+WHITELIST_PAGE_SIZE = 50
+WHITELIST_PREVIEW = 20
+
+# 命令参数中表示强制打卡（忽略当天已打卡记录）的写法
+FORCE_OPTIONS = ("强制", "force", "--force", "-f")
+
 @register("qq_group_sign", "EraAsh", "QQ群打卡插件，支持自动定时打卡、白名单模式、管理员通知等功能", "2.1.0", "https://github.com/EraAsh/astrbot_plugin_qq_group_sign")
 class QQGroupSignPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
+        # 构造函数只建立内存中的对象，存储后端、历史压缩和指标端点都在后台初始化
+        init_start = time_module.perf_counter()
         super().__init__(context)
         self.config = config
         self.plugin_data_dir = StarTools.get_data_dir()
         self.plugin_data_dir.mkdir(parents=True, exist_ok=True)
-        self.storage_file = self.plugin_data_dir / "group_sign_data.json"
         
         self.task: Optional[asyncio.Task] = None
-        self.whitelist_groups: List[str] = []
+        self.whitelist_groups = Whitelist()
+        self.group_schedules: Dict[str, str] = {}
+        # 群优先级，未设置的群为普通优先级
+        self.group_priorities: Dict[str, int] = {}
+        # 每个打卡时间点最近一次完成的定时打卡（目标时间，ISO 格式），用于启动时补打卡
+        self.last_scheduled_runs: Dict[str, str] = {}
         self.sign_statistics: Dict[str, Any] = {
             "total_signs": 0,
             "success_count": 0,
@@ -33,10 +91,65 @@ class QQGroupSignPlugin(Star):
         self.is_active = self.config.get("enable_auto_sign", True)
         self._stop_event = asyncio.Event()
         self.timezone = timezone(timedelta(hours=self.config.get("timezone", 8)))
+        # 存储后端在 _async_init 中创建（SQLite 首次使用时需要迁移数据），创建前不读写存储
+        self.backend = None
         self.debug_mode = False
         self.bot_instance = None
         self.platform_name = ""
+        # 所有已连接的账号，self_id -> BotAccount；bot_instance 为最先捕获的实例
+        # 配置了 OneBot 直连地址时，bot_instance 为直连客户端，启动后即可调用接口
+        self.direct_client = None
+        self.direct_client_task: Optional[asyncio.Task] = None
+        self.accounts: Dict[str, BotAccount] = {}
+        # 第一个账号登记后置位；补打卡要等到能调用 set_group_sign 时才开始
+        self._account_ready = asyncio.Event()
         self._initialized = asyncio.Event()
+        self.timer = PrecisionTimer(self._get_local_time)
+        self.dispatcher = self._new_dispatcher()
+        self.account_dispatchers: Dict[str, SignDispatcher] = {}
+        # 慢群单独走低并发的慢速通道，不占用正常群的并发
+        self.slow_dispatcher = self._new_slow_dispatcher(self.dispatcher)
+        self.account_slow_dispatchers: Dict[str, SignDispatcher] = {}
+        # 平台接口熔断器：接口不可用时跳过调用，避免每个群都白白等待一次失败
+        self.breakers = BreakerRegistry(
+            failure_threshold=self.config.get("breaker_failure_threshold", 5),
+            recovery_timeout=self.config.get("breaker_recovery_seconds", 60),
+        )
+        for action in ('set_group_sign', 'send_group_msg', 'get_group_list'):
+            self.breakers.get(action)
+        self.retry_enabled = self.config.get("retry_enabled", True)
+        self.retry_queue = RetryQueue(
+            max_attempts=self.config.get("retry_max_attempts", 5),
+            base_delay=self.config.get("retry_base_delay", 60),
+            max_delay=self.config.get("retry_max_delay", 3600),
+        )
+        self.retry_task: Optional[asyncio.Task] = None
+        # 管理员通知聚合器（AdminNotifier），第一次发送通知时创建
+        self.notifier = None
+        self.store = WriteBehindStore(None, debounce=self.config.get("save_debounce_seconds", 2.0))
+        self.store.register(STATE_DOCUMENT, self._snapshot_state)
+        self.store.register(RETRY_DOCUMENT, self.retry_queue.to_dict)
+        self.group_directories: Dict[str, GroupDirectory] = {}
+        self.store.register(DIRECTORY_DOCUMENT, self._snapshot_group_directories)
+        # 每个群最近一次打卡成功的日期，当天已打卡的群不再重复打卡
+        self.ledger = SignLedger()
+        self.store.register(LEDGER_DOCUMENT, self._snapshot_ledger)
+        # 每个群的接口耗时估计，用于单次调用超时和慢群识别
+        self.latency = LatencyTracker(
+            default_timeout=self.config.get("sign_call_timeout", 15),
+            min_timeout=self.config.get("sign_call_min_timeout", 2),
+            slow_threshold=self.config.get("slow_group_threshold", 3.0),
+        )
+        self.store.register(LATENCY_DOCUMENT, self.latency.to_dict)
+        # 打卡批次检查点：逐群追加完成记录，中断后可继续剩余的群
+        self.checkpoints = CheckpointStore(self.plugin_data_dir / "sign_batches")
+        self.group_refresh_task: Optional[asyncio.Task] = None
+        self.history = SignHistory(
+            None,
+            self.timezone,
+            retention_days=self.config.get("history_retention_days", 7),
+            flush_interval=self.config.get("save_debounce_seconds", 2.0),
+        )
         
         # 解析打卡时间
         sign_time_str = self.config.get("sign_time", "08:00:00")
@@ -46,36 +159,227 @@ class QQGroupSignPlugin(Star):
         except:
             self.sign_time = time(8, 0, 0)
             logger.warning(f"打卡时间格式错误，使用默认时间 08:00:00")
-        
-        asyncio.create_task(self._async_init())
+        self.schedule = self._build_schedule()
+        self._run_tasks: Set[asyncio.Task] = set()
+        self._init_metrics()
+        # 指标端点（MetricsServer），启用时在后台初始化中创建
+        self.metrics_server = None
+        self._background_init_task: Optional[asyncio.Task] = None
+        # 启动耗时（秒）：模块导入、同步构造、加载状态
+        self.startup_timings: Dict[str, float] = {
+            "导入": _IMPORT_SECONDS,
+            "构造": time_module.perf_counter() - init_start,
+        }
+
+        self._init_task = asyncio.create_task(self._async_init())
+
+    def _init_metrics(self):
+        """注册插件指标，队列深度等状态在导出时读取"""
+        self.metrics = MetricsRegistry()
+        self.metric_action_latency = self.metrics.histogram(
+            "action_latency_seconds", "平台接口调用耗时", ("action",)
+        )
+        self.metric_signs = self.metrics.counter(
+            "signs_total", "打卡结果计数", ("result", "error_class")
+        )
+        self.metric_batch_duration = self.metrics.histogram(
+            "batch_duration_seconds", "打卡批次耗时", buckets=DURATION_BUCKETS
+        )
+        self.metrics.gauge("scheduler_skew_seconds", "上次定时触发与目标时间的偏差", fn=lambda: self.timer.last_skew)
+        self.metrics.gauge("retry_queue_depth", "待重试的群数量", fn=lambda: len(self.retry_queue))
+        self.metrics.gauge("dispatch_rate", "当前打卡速率（每秒）", fn=lambda: self.dispatcher.current_rate)
+        self.metrics.gauge(
+            "store_flush_seconds", "上次持久化落盘耗时", fn=lambda: self.store.last_flush_latency
+        )
+        self.metrics.gauge(
+            "store_flush_max_seconds", "持久化落盘最大耗时", fn=lambda: self.store.max_flush_latency
+        )
+        self.metrics.gauge("store_writes", "持久化写入次数", fn=lambda: self.store.writes)
+        self.metrics.gauge("slow_groups", "慢速通道中的群数量", fn=self.latency.slow_count)
+        self.metrics.gauge(
+            "startup_seconds", "插件启动到可以处理命令的耗时", fn=lambda: sum(self.startup_timings.values())
+        )
+
+    def _metrics_summary(self) -> str:
+        """状态消息中的指标摘要：接口耗时分位数、批次耗时、失败分类和重试队列"""
+        lines = []
+        for action in ('set_group_sign', 'send_group_msg', 'get_group_list'):
+            count = self.metric_action_latency.count(action=action)
+            if count:
+                p50 = self.metric_action_latency.quantile(0.5, action=action)
+                p99 = self.metric_action_latency.quantile(0.99, action=action)
+                lines.append(f"{action}: {count} 次，p50 {p50 * 1000:.0f}ms，p99 {p99 * 1000:.0f}ms")
+        batches = self.metric_batch_duration.count()
+        if batches:
+            lines.append(f"批次: {batches} 次，p50 {self.metric_batch_duration.quantile(0.5):.1f}s")
+        failures = [
+            f"{error_class or '未知'}={value:.0f}"
+            for (result, error_class), value in self.metric_signs.items() if result == "failure"
+        ]
+        if failures:
+            lines.append("失败分类: " + ", ".join(failures))
+        if len(self.retry_queue):
+            lines.append(f"待重试: {len(self.retry_queue)} 个群")
+        if self.metrics_server:
+            lines.append(f"端点: http://{self.metrics_server.host}:{self.metrics_server.port}/metrics")
+        return "\n📈 指标:\n" + "\n".join(lines) if lines else ""
+
+    async def _start_metrics_server(self):
+        if not self.config.get("metrics_enabled", False):
+            return
+        from .metrics_server import MetricsServer
+
+        server = MetricsServer(
+            self.metrics,
+            host=self.config.get("metrics_host", "127.0.0.1"),
+            port=self.config.get("metrics_port", 9466),
+        )
+        try:
+            await server.start()
+            self.metrics_server = server
+        except Exception as e:
+            logger.error(f"指标端点启动失败: {e}")
     
+    async def _open_backend(self):
+        """在线程中创建存储后端，失败时回退到 JSON 后端"""
+        kind = self.config.get("storage_backend", "json")
+        try:
+            self.backend = await asyncio.to_thread(create_backend, kind, self.plugin_data_dir, self.timezone)
+        except Exception as e:
+            logger.error(f"存储后端 {kind} 初始化失败，使用 json: {e}", exc_info=True)
+            self.backend = JsonBackend(self.plugin_data_dir)
+        self.store.backend = self.backend
+        self.history.sink = self.backend.history_sink
+
     async def _async_init(self):
+        """加载持久化状态并启动定时任务，完成后命令才开始处理；其余初始化放到后台"""
+        phase_start = time_module.perf_counter()
+        await self._open_backend()
+        self.startup_timings["存储"] = time_module.perf_counter() - phase_start
+
+        phase_start = time_module.perf_counter()
         await self._load_config()
-        logger.info(
-            f"QQ群打卡插件初始化完成 | is_active={self.is_active} "
-            f"whitelist_mode={self.config.get('whitelist_mode', False)}"
+        self.schedule = self._build_schedule()
+        retry_data, directory_data, ledger_data, latency_data = await asyncio.gather(
+            self.store.read(RETRY_DOCUMENT),
+            self.store.read(DIRECTORY_DOCUMENT),
+            self.store.read(LEDGER_DOCUMENT),
+            self.store.read(LATENCY_DOCUMENT),
         )
+        self.retry_queue.restore(retry_data)
+        self._restore_group_directories(directory_data)
+        self.ledger.restore(ledger_data)
+        self.latency.restore(latency_data)
+        self.startup_timings["状态"] = time_module.perf_counter() - phase_start
+
+        self._init_direct_client()
         if self.is_active:
             await self._start_sign_task()
+            await self._start_catchup()
+        if self.retry_enabled:
+            self.retry_task = asyncio.create_task(self._retry_worker())
+        self.group_refresh_task = asyncio.create_task(self._group_refresh_task())
         self._initialized.set()
+        logger.info(
+            f"QQ群打卡插件初始化完成 | is_active={self.is_active} "
+            f"whitelist_mode={self.config.get('whitelist_mode', False)} | 启动耗时 "
+            f"{sum(self.startup_timings.values()) * 1000:.0f}ms ("
+            + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.startup_timings.items())
+            + ")"
+        )
+        self._background_init_task = asyncio.create_task(self._background_init())
+
+    def _init_direct_client(self):
+        """按配置创建 OneBot 直连客户端并作为 bot_instance，账号在后台通过 get_login_info 登记"""
+        url = str(self.config.get("onebot_url", "") or "").strip()
+        if not url:
+            return
+        from .onebot_client import create_onebot_client
+
+        try:
+            self.direct_client = create_onebot_client(url, self.config.get("onebot_token", ""))
+        except ValueError as e:
+            logger.error(f"OneBot 直连未启用: {e}")
+            return
+        self.bot_instance = self.direct_client
+        self.platform_name = self.platform_name or "aiocqhttp"
+        self.direct_client_task = asyncio.create_task(self._register_direct_client())
+
+    async def _register_direct_client(self):
+        """查询直连账号的 QQ 号并登记为账号，失败时按指数退避重试"""
+        delay = 5
+        while True:
+            try:
+                info = await self.direct_client.call_action('get_login_info')
+                self_id = str(info["user_id"])
+                self.accounts[self_id] = BotAccount(self_id, self.direct_client)
+                self._account_ready.set()
+                logger.info(f"OneBot 直连已就绪 (账号 {self_id})，后台 API 调用已启用")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"OneBot 直连获取登录信息失败: {e}，{delay} 秒后重试")
+                await asyncio.sleep(delay)
+                delay = min(300, delay * 2)
+
+    async def _background_init(self):
+        """不影响命令处理的初始化：压缩打卡历史、启动指标端点"""
+        start = time_module.perf_counter()
+        await self.history.compact()
+        await self._start_metrics_server()
+        logger.info(f"后台初始化完成，耗时 {(time_module.perf_counter() - start) * 1000:.0f}ms")
+
+    def _new_dispatcher(self) -> SignDispatcher:
+        return SignDispatcher(
+            concurrency=self.config.get("sign_concurrency", 10),
+            rate=self.config.get("sign_rate_limit", 5.0),
+            burst=self.config.get("sign_rate_burst", 10),
+            adaptive=self.config.get("adaptive_backoff", True),
+        )
+
+    def _new_slow_dispatcher(self, dispatcher: SignDispatcher) -> SignDispatcher:
+        """慢速通道：与对应的正常通道共用令牌桶，不做自适应退避，以免慢群的超时拖慢正常群"""
+        slow = SignDispatcher(
+            concurrency=self.config.get("slow_lane_concurrency", 2),
+            rate=dispatcher.base_rate,
+            adaptive=False,
+        )
+        slow.bucket = dispatcher.bucket
+        return slow
+
+    def _build_schedule(self) -> ScheduleTable:
+        """根据配置的打卡时间点和各群单独设置的时间生成时间表"""
+        slots = [self.sign_time]
+        for time_str in self.config.get("sign_slots", []) or []:
+            try:
+                slots.append(parse_time_str(time_str))
+            except ValueError:
+                logger.warning(f"忽略格式错误的打卡时间点: {time_str}")
+        overrides = {}
+        for group_id, time_str in self.group_schedules.items():
+            try:
+                overrides[group_id] = parse_time_str(time_str)
+            except ValueError:
+                logger.warning(f"群 {group_id} 的打卡时间格式错误: {time_str}")
+        return ScheduleTable(slots, overrides, self.config.get("sign_spread_minutes", 0))
+
+    def _reschedule(self):
+        """时间表变化后重建并立即唤醒定时任务"""
+        self.schedule = self._build_schedule()
+        self.timer.interrupt()
 
     def _get_next_run_time(self) -> datetime:
         """计算下一次任务执行的本地时间"""
-        now = self._get_local_time()
-        target_time = now.replace(
-            hour=self.sign_time.hour,
-            minute=self.sign_time.minute,
-            second=self.sign_time.second,
-            microsecond=0
-        )
-        if now >= target_time:
-            target_time += timedelta(days=1)
-        return target_time
+        return self.schedule.next_run(self._get_local_time())
 
     async def _load_config(self):
         """异步加载配置文件"""
         default_values = {
-            "whitelist_groups": [],
+            "whitelist_groups": Whitelist(),
+            "group_schedules": {},
+            "group_priorities": {},
+            "last_scheduled_runs": {},
             "sign_statistics": {
                 "total_signs": 0,
                 "success_count": 0,
@@ -85,35 +389,25 @@ class QQGroupSignPlugin(Star):
         }
         
         try:
-            if not await asyncio.to_thread(os.path.exists, self.storage_file):
+            loaded_data = await self.store.read(STATE_DOCUMENT)
+            if loaded_data is None:
                 logger.debug("配置文件不存在，使用默认值")
                 for key, value in default_values.items():
                     setattr(self, key, value)
                 return True, "default"
     
-            async with aiofiles.open(self.storage_file, 'r', encoding='utf-8') as f:
-                try:
-                    file_content = await f.read()
-                    loaded_data = json.loads(file_content)
-                    
-                    if not isinstance(loaded_data, dict):
-                        raise ValueError("配置文件根节点不是一个JSON对象")
-                    
-                    # 确保群号统一为字符串类型
-                    if "whitelist_groups" in loaded_data:
-                        loaded_data["whitelist_groups"] = [str(gid) for gid in loaded_data["whitelist_groups"]]
-                    
-                    for key in default_values:
-                        if key in loaded_data:
-                            setattr(self, key, loaded_data[key])
-                    
-                    return True, "file"
-                            
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"配置文件解析失败: {e}")
-                    corrupted_file = f"{self.storage_file}.corrupted"
-                    await asyncio.to_thread(os.rename, self.storage_file, corrupted_file)
-                    logger.warning(f"已备份损坏文件到: {corrupted_file}")
+            if isinstance(loaded_data, dict):
+                # 确保群号统一为字符串类型
+                if "whitelist_groups" in loaded_data:
+                    loaded_data["whitelist_groups"] = Whitelist(loaded_data["whitelist_groups"])
+                
+                for key in default_values:
+                    if key in loaded_data:
+                        setattr(self, key, loaded_data[key])
+                
+                return True, self.backend.name
+            
+            logger.error("配置文件解析失败: 根节点不是一个JSON对象")
         
         except Exception as e:
             logger.error(f"加载配置异常: {str(e)}", exc_info=True)
@@ -126,29 +420,19 @@ class QQGroupSignPlugin(Star):
         logger.warning(f"使用默认配置")
         return False, "default"
 
-    async def _save_config(self) -> bool:
-        """原子性异步保存配置"""
-        temp_path = f"{self.storage_file}.tmp"
-        data = {
-            "whitelist_groups": self.whitelist_groups,
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """需要持久化的插件状态"""
+        return {
+            "whitelist_groups": self.whitelist_groups.to_list(),
+            "group_schedules": self.group_schedules,
+            "group_priorities": self.group_priorities,
+            "last_scheduled_runs": self.last_scheduled_runs,
             "sign_statistics": self.sign_statistics
         }
-        
-        try:
-            async with aiofiles.open(temp_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(data, ensure_ascii=False, indent=2))
-            
-            await asyncio.to_thread(os.replace, temp_path, self.storage_file)
-            logger.info(f"配置已保存")
-            return True
-            
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
-            try:
-                await asyncio.to_thread(os.unlink, temp_path)
-            except:
-                pass
-            return False
+
+    def _save_config(self):
+        """标记配置待保存，由写回存储合并后原子写入"""
+        self.store.mark_dirty(STATE_DOCUMENT)
 
     async def _start_sign_task(self):
         """启动打卡任务"""
@@ -160,62 +444,138 @@ class QQGroupSignPlugin(Star):
     def _get_local_time(self) -> datetime:
         return datetime.now(self.timezone)
 
-    async def _perform_group_sign(self, group_id: Union[str, int]) -> dict:
-        """执行群打卡"""
+    async def _perform_group_sign(self, group_id: Union[str, int], bot: Any = None) -> dict:
+        """执行群打卡，并把本次尝试写入打卡历史；bot 为空时使用 bot_instance"""
+        start = time_module.perf_counter()
+        result = await self._sign_group_once(group_id, bot or self.bot_instance)
+        self.metric_signs.inc(
+            result="success" if result["success"] else "failure",
+            error_class="" if result["success"] else result.get("error_class") or "",
+        )
+        self.history.record(
+            group_id,
+            result.get("path"),
+            time_module.perf_counter() - start,
+            None if result["success"] else result.get("error_class"),
+        )
+        return result
+
+    async def _sign_group_once(self, group_id: Union[str, int], bot: Any) -> dict:
+        """执行群打卡：优先 NapCat 专用 API，失败后回退为发送消息
+
+        两条路径各有熔断器：专用 API 熔断时直接发送消息，发送消息也熔断时跳过本群。
+        每次调用的超时由该群的历史耗时估计得出，超时按瞬时错误处理，不计入熔断器的失败次数
+        """
+        path = None
+        timeout = self.latency.timeout_for(str(group_id))
         try:
             # 优先使用 NapCat 专用签到 API (如果已捕获 bot 实例)
-            if self.bot_instance:
+            sign_breaker = self.breakers.get('set_group_sign')
+            if bot and sign_breaker.allow():
                 try:
-                    result = await self.bot_instance.api.call_action(
-                        'set_group_sign',
-                        group_id=int(group_id)
-                    )
+                    path = PATH_API
+                    call_start = time_module.perf_counter()
+                    try:
+                        result = await asyncio.wait_for(
+                            bot.api.call_action('set_group_sign', group_id=int(group_id)),
+                            timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        self.latency.record(str(group_id), timeout, timed_out=True)
+                        raise asyncio.TimeoutError(f"set_group_sign 超过 {timeout:.1f}s 未返回")
+                    else:
+                        self.latency.record(str(group_id), time_module.perf_counter() - call_start)
+                    finally:
+                        self.metric_action_latency.observe(
+                            time_module.perf_counter() - call_start, action='set_group_sign'
+                        )
+                    sign_breaker.record_success()
                     logger.info(f"群 {group_id} 打卡成功，使用 NapCat 专用签到 API")
-                    return {"success": True, "message": "打卡成功", "result": result}
+                    return {"success": True, "message": "打卡成功", "result": result, "path": path}
+                except asyncio.TimeoutError as api_error:
+                    sign_breaker.record_timeout()
+                    logger.warning(f"NapCat 专用签到 API 调用失败: {api_error}，使用回退方法")
                 except Exception as api_error:
+                    sign_breaker.record_failure(api_error)
                     logger.warning(f"NapCat 专用签到 API 调用失败: {api_error}，使用回退方法")
 
             # 回退方法：发送普通消息
+            path = PATH_FALLBACK
+            send_breaker = self.breakers.get('send_group_msg')
+            send_breaker.check()
             sign_message = self.config.get("sign_message", "打卡成功！")
             message_chain = [Plain(sign_message)]
             
             # 使用 AstrBot 标准的会话标识符格式
             # 根据 AstrBot 文档，正确的格式应该是 "platform_name:GROUP:group_id"
             session_str = f"{self.platform_name or 'aiocqhttp'}:GROUP:{group_id}"
-            await self.context.send_message(session_str, message_chain)
+            call_start = time_module.perf_counter()
+            try:
+                await asyncio.wait_for(self.context.send_message(session_str, message_chain), timeout)
+            except asyncio.TimeoutError:
+                send_breaker.record_timeout()
+                raise
+            except Exception as send_error:
+                send_breaker.record_failure(send_error)
+                raise
+            finally:
+                self.metric_action_latency.observe(time_module.perf_counter() - call_start, action='send_group_msg')
+            send_breaker.record_success()
             
             logger.info(f"群 {group_id} 打卡成功 (回退模式)")
-            return {"success": True, "message": "打卡成功"}
+            return {"success": True, "message": "打卡成功", "path": path}
+
+        except CircuitOpenError as e:
+            # 两条路径都已熔断，不再逐群记录错误堆栈，交给重试队列稍后处理
+            logger.debug(f"群 {group_id} 跳过打卡: {e}")
+            return {"success": False, "message": f"群 {group_id} 跳过打卡: {e}", "error_class": TRANSIENT, "path": None}
             
         except Exception as e:
             error_msg = f"群 {group_id} 打卡失败: {str(e)}"
             logger.error(error_msg, exc_info=True)
-            return {"success": False, "message": error_msg}
+            return {"success": False, "message": error_msg, "error_class": classify_error(e), "path": path}
 
     async def _notify_admin(self, message: str):
-        """通知管理员"""
+        """通知管理员：交给聚合器，在通知窗口结束时合并发送"""
         if not self.config.get("admin_notification", True):
             return
-            
+        if not self.config.get("admin_group_id", ""):
+            logger.info(f"管理员通知 (未配置管理群): {message}")
+            return
+        if self.notifier is None:
+            from .notifier import AdminNotifier
+
+            # 按窗口合并发送，与打卡共用限速器
+            self.notifier = AdminNotifier(
+                self._send_admin_message,
+                self._get_local_time,
+                window=self.config.get("notify_window_seconds", 30),
+                max_length=self.config.get("notify_max_length", 1500),
+                acquire=lambda: self.dispatcher.bucket.acquire(),
+            )
+        await self.notifier.add(message)
+
+    async def _send_admin_message(self, notification_msg: str):
+        """向管理群发送一条已合并的通知"""
         try:
             admin_group_id = self.config.get("admin_group_id", "")
             if not admin_group_id:
-                logger.info(f"管理员通知 (未配置管理群): {message}")
                 return
 
-            notification_msg = f"📊 QQ群打卡通知\n{message}"
-            
-            # 优先使用平台 API 发送 (如果已捕获 bot 实例)
-            if self.bot_instance:
+            # 优先使用平台 API 发送 (如果已捕获 bot 实例且接口未熔断)
+            send_breaker = self.breakers.get('send_group_msg')
+            if self.bot_instance and send_breaker.allow():
                 try:
                     await self.bot_instance.api.call_action(
                         'send_group_msg',
                         group_id=int(admin_group_id),
                         message=notification_msg
                     )
+                    send_breaker.record_success()
                     logger.info(f"管理员通知已通过 API 发送至群 {admin_group_id}")
                     return
                 except Exception as api_error:
+                    send_breaker.record_failure(api_error)
                     logger.warning(f"平台 API 通知失败: {api_error}，使用回退方法")
 
             # 回退方法：使用 context.send_message
@@ -227,160 +587,654 @@ class QQGroupSignPlugin(Star):
         except Exception as e:
             logger.error(f"通知管理员失败: {e}")
 
-    async def _sign_target_groups(self, group_list: List[str]) -> str:
-        """打卡指定群组列表"""
-        if not group_list:
-            return "❌ 没有可打卡的群组"
-            
-        tasks = [self._perform_group_sign(group_id) for group_id in group_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 统计结果
-        success_count = 0
-        fail_count = 0
-        
-        # 构建结果消息
-        messages = []
-        for group_id, result in zip(group_list, results):
-            # 处理异常情况
-            if isinstance(result, Exception):
-                status = f"❌ 失败: {str(result)}"
-                fail_count += 1
-                logger.error(f"群 {group_id} 打卡异常: {str(result)}", exc_info=True)
-            elif isinstance(result, dict):
-                if result.get("success", False):
-                    status = "✅ 成功"
-                    success_count += 1
+    def _get_account_dispatcher(self, self_id: str, slow: bool = False) -> SignDispatcher:
+        """每个账号独立的调度器，各自有并发和速率限制；慢速通道与同账号的正常通道共用令牌桶"""
+        dispatcher = self.account_dispatchers.get(self_id)
+        if dispatcher is None:
+            dispatcher = self.account_dispatchers[self_id] = self._new_dispatcher()
+        if not slow:
+            return dispatcher
+        slow_dispatcher = self.account_slow_dispatchers.get(self_id)
+        if slow_dispatcher is None:
+            slow_dispatcher = self.account_slow_dispatchers[self_id] = self._new_slow_dispatcher(dispatcher)
+        return slow_dispatcher
+
+    async def _dispatch(
+        self,
+        group_list: List[str],
+        offsets: Optional[List[float]] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """打卡一批群，按完成顺序产出 (下标, 结果)
+
+        按群优先级排序，deadline 之后不再开始高优先级以外的群。
+        多账号时按群成员关系把群分给各账号；每个账号的慢群进入慢速通道，
+        各通道的调度器并行执行
+        """
+        priorities = (
+            [self.group_priorities.get(group_id, PRIORITY_NORMAL) for group_id in group_list]
+            if self.group_priorities else None
+        )
+        # 下标用 range 或 array('L') 保存，大批次时不为每个群创建 int 对象列表
+        if len(self.accounts) <= 1:
+            shards = {None: range(len(group_list))}
+        else:
+            await self._refresh_group_directories()
+            memberships = {self_id: self._get_group_directory(self_id) for self_id in self.accounts}
+            shards = shard_groups(group_list, memberships, next(iter(self.accounts)))
+            logger.info("按账号分片打卡: " + ", ".join(f"{sid}={len(idx)}" for sid, idx in shards.items()))
+
+        lanes: List[Tuple[SignDispatcher, Any, Sequence[int]]] = []
+        for self_id, indices in shards.items():
+            account = self.accounts.get(self_id) if self_id is not None else None
+            slow_indices = array('L', (i for i in indices if self.latency.is_slow(group_list[i])))
+            if slow_indices:
+                slow_set = set(slow_indices)
+                indices = array('L', (i for i in indices if i not in slow_set))
+                logger.info(f"{len(slow_indices)} 个慢群进入慢速通道")
+            for slow, lane_indices in ((False, indices), (True, slow_indices)):
+                if not lane_indices:
+                    continue
+                if self_id is None:
+                    dispatcher = self.slow_dispatcher if slow else self.dispatcher
                 else:
-                    status = f"❌ 失败: {result.get('message', '未知错误')}"
-                    fail_count += 1
-            else:
-                status = "❌ 失败: 返回结果异常"
-                fail_count += 1
-            
-            messages.append(f"群 {group_id} 打卡{status}")
-        
-        # 更新统计信息
-        self.sign_statistics["total_signs"] += len(group_list)
-        self.sign_statistics["success_count"] += success_count
-        self.sign_statistics["fail_count"] += fail_count
-        self.sign_statistics["last_sign_time"] = datetime.now().isoformat()
-        await self._save_config()
-        
-        summary = f"\n📊 本次打卡统计: 成功 {success_count} 个，失败 {fail_count} 个"
-        messages.append(summary)
-        
-        # 通知管理员
-        admin_message = f"完成群组打卡\n成功: {success_count}\n失败: {fail_count}\n总计: {len(group_list)}"
+                    dispatcher = self._get_account_dispatcher(self_id, slow)
+                lanes.append((dispatcher, account, lane_indices))
+
+        finished: asyncio.Queue = asyncio.Queue()
+
+        def _view(values: Optional[Sequence[Any]], indices: Sequence[int]) -> Optional[Sequence[Any]]:
+            # 通道覆盖全部群时直接使用原列表，否则按下标引用，不复制
+            if not values or (isinstance(indices, range) and len(indices) == len(values)):
+                return values or None
+            return SubsetView(values, indices)
+
+        async def _run_lane(dispatcher: SignDispatcher, account: Any, indices: Sequence[int]):
+            async for position, result in dispatcher.iter_results(
+                _view(group_list, indices),
+                lambda group_id: self._perform_group_sign(group_id, account),
+                _view(offsets, indices),
+                _view(priorities, indices),
+                deadline,
+            ):
+                finished.put_nowait((indices[position], result))
+
+        tasks = [asyncio.create_task(_run_lane(*lane)) for lane in lanes]
+        try:
+            for _ in range(len(group_list)):
+                yield await finished.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _iter_sign_results(
+        self,
+        group_list: List[str],
+        offsets: Optional[List[float]] = None,
+        checkpoint: Optional[BatchCheckpoint] = None,
+        budget: bool = False,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """逐个产出 (群号, 结果)，按完成顺序；同时登记重试队列并更新统计
+
+        结果统一为 {"success": bool, "message": str}。完成的群分批追加到检查点，检查点由调用方创建和释放；
+        状态每 CHECKPOINT_SAVE_EVERY 个群保存一次。
+        budget=True 时使用配置的时间预算，超出预算未执行的群结果带 "deferred": True
+        """
+        done = 0
+        start = time_module.perf_counter()
+        today = self._today()
+        budget_minutes = self.config.get("sign_time_budget_minutes", 0) if budget else 0
+        deadline = time_module.monotonic() + budget_minutes * 60 if budget_minutes > 0 else None
+        try:
+            async for index, result in self._dispatch(group_list, offsets, deadline):
+                group_id = group_list[index]
+                if isinstance(result, BudgetExceeded):
+                    # 低优先级的群超出预算：推迟到重试队列或本次直接放弃，不计入成功/失败
+                    if self.config.get("budget_overflow_action", "defer") == "defer" and self._schedule_retry(
+                        group_id, TRANSIENT, str(result)
+                    ):
+                        message = "超出时间预算，已推迟到重试队列"
+                    else:
+                        message = "超出时间预算，本次跳过"
+                    if checkpoint:
+                        await checkpoint.mark_done(group_id)
+                    yield group_id, {"success": False, "deferred": True, "message": message}
+                    continue
+                if isinstance(result, Exception):
+                    logger.error(f"群 {group_id} 打卡异常: {str(result)}", exc_info=result)
+                    self._schedule_retry(group_id, classify_error(result), str(result))
+                    result = {"success": False, "message": str(result)}
+                elif not isinstance(result, dict):
+                    result = {"success": False, "message": "返回结果异常"}
+                elif result.get("success", False):
+                    self.retry_queue.discard(group_id)
+                    self.ledger.mark(group_id, today)
+                else:
+                    self._schedule_retry(group_id, result.get("error_class"), result.get("message", ""))
+
+                done += 1
+                self.sign_statistics["total_signs"] += 1
+                self.sign_statistics["success_count" if result["success"] else "fail_count"] += 1
+                if checkpoint:
+                    await checkpoint.mark_done(group_id)
+                if done % CHECKPOINT_SAVE_EVERY == 0:
+                    self._save_config()
+                    self.store.mark_dirty(RETRY_DOCUMENT)
+                    self.store.mark_dirty(LEDGER_DOCUMENT)
+                    self.store.mark_dirty(LATENCY_DOCUMENT)
+                yield group_id, result
+        finally:
+            self.metric_batch_duration.observe(time_module.perf_counter() - start)
+            if done:
+                self.sign_statistics["last_sign_time"] = datetime.now().isoformat()
+                self._save_config()
+                self.store.mark_dirty(RETRY_DOCUMENT)
+                self.store.mark_dirty(LEDGER_DOCUMENT)
+                self.store.mark_dirty(LATENCY_DOCUMENT)
+
+    async def _finish_batch(self, total: int, tally: BatchTally, skipped: int = 0) -> str:
+        """通知管理员并返回本批次的简要统计
+
+        skipped 为今天已打卡而跳过的群数；tally.deferred 为超出时间预算未执行的群数
+        """
+        success_count, fail_count, deferred = tally.success, tally.failed, tally.deferred
+        skipped_msg = f"\n跳过(今日已打卡): {skipped}" if skipped else ""
+        deferred_msg = f"\n超出时间预算: {deferred}" if deferred else ""
+        admin_message = (
+            f"完成群组打卡\n成功: {success_count}\n失败: {fail_count}\n总计: {total}{skipped_msg}{deferred_msg}"
+        )
         await self._notify_admin(admin_message)
-        
-        return "\n".join(messages)
+        summary = f"📊 本次打卡统计: 成功 {success_count} 个，失败 {fail_count} 个"
+        if skipped:
+            summary += f"，今天已打卡跳过 {skipped} 个"
+        if deferred:
+            summary += f"，超出时间预算 {deferred} 个"
+        return summary
+
+    def _format_failure_pages(self, tally: BatchTally) -> List[str]:
+        """失败明细按原因归类后分页，每页不超过通知最大长度"""
+        from .notifier import split_chunks
+
+        pages = split_chunks(tally.failure_lines(), self.config.get("notify_max_length", 1500))
+        return [f"❌ 失败明细 ({number}/{len(pages)}):\n{page}" for number, page in enumerate(pages, 1)]
+
+    async def _sign_target_groups(
+        self,
+        group_list: List[str],
+        offsets: Optional[List[float]] = None,
+        checkpoint: Optional[BatchCheckpoint] = None,
+    ) -> str:
+        """打卡指定群组列表，offsets 为各群相对开始时间的延后秒数，返回统计和失败的群
+
+        今天已打卡成功的群会被跳过；传入 checkpoint 时逐群记录进度，返回后由调用方释放
+        """
+        if not group_list:
+            return "❌ 没有可打卡的群组"
+
+        tally = BatchTally()
+        group_list, offsets, skipped = self._skip_signed_today(group_list, offsets)
+        if not group_list:
+            return f"✅ {skipped} 个群今天都已打卡，全部跳过"
+
+        async for group_id, result in self._iter_sign_results(group_list, offsets, checkpoint, budget=True):
+            tally.add(group_id, result)
+
+        summary = await self._finish_batch(len(group_list), tally, skipped)
+        if tally.failed:
+            preview = ", ".join(tally.failed_groups(50))
+            more = f" 等 {tally.failed} 个" if tally.failed > 50 else ""
+            summary += f"\n失败的群: {preview}{more}"
+        return summary
+
+    def _today(self) -> int:
+        """配置时区下的今天，date.toordinal() 表示"""
+        return self._get_local_time().toordinal()
+
+    def _snapshot_ledger(self) -> Dict[str, Any]:
+        # 只有今天的记录影响去重，保留昨天以应对时区切换
+        self.ledger.prune(self._today() - 1)
+        return self.ledger.to_dict()
+
+    def _skip_signed_today(
+        self, group_list: List[str], offsets: Optional[List[float]] = None, force: bool = False
+    ):
+        """去掉今天已打卡成功的群，返回 (群列表, 偏移, 跳过数量)"""
+        if force or not self.config.get("skip_signed_today", True):
+            return group_list, offsets, 0
+        today = self._today()
+        keep = [i for i, group_id in enumerate(group_list) if not self.ledger.signed_on(group_id, today)]
+        if len(keep) == len(group_list):
+            return group_list, offsets, 0
+        return (
+            [group_list[i] for i in keep],
+            [offsets[i] for i in keep] if offsets else None,
+            len(group_list) - len(keep),
+        )
+
+    def _schedule_retry(self, group_id: str, error_class: Optional[str], message: str) -> bool:
+        """将失败的群加入重试队列"""
+        if not self.retry_enabled:
+            return False
+        return self.retry_queue.push(str(group_id), error_class or classify_error(message), message)
+
+    async def _retry_worker(self):
+        """后台重试任务：按队列中的到期时间重新打卡"""
+        try:
+            while True:
+                self.retry_queue.wakeup.clear()
+                next_due = self.retry_queue.next_due()
+                timeout = None if next_due is None else max(0.0, next_due - datetime.now().timestamp())
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(self.retry_queue.wakeup.wait(), timeout=timeout)
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+
+                due_groups = self.retry_queue.due()
+                # 已在其他途径（手动打卡、下一轮定时打卡）成功的群直接出队
+                today = self._today()
+                for group_id in [g for g in due_groups if self.ledger.signed_on(g, today)]:
+                    self.retry_queue.discard(group_id)
+                    due_groups.remove(group_id)
+                if not due_groups:
+                    self.store.mark_dirty(RETRY_DOCUMENT)
+                    continue
+
+                logger.info(f"开始重试 {len(due_groups)} 个打卡失败的群")
+                success_count = 0
+                async for _, result in self._iter_sign_results(due_groups):
+                    success_count += result["success"]
+                logger.info(f"重试完成: 成功 {success_count} 个，剩余待重试 {len(self.retry_queue)} 个")
+        except asyncio.CancelledError:
+            logger.info("打卡重试任务已停止")
+        except Exception as e:
+            logger.error(f"打卡重试任务异常终止: {e}", exc_info=True)
+
+    def _get_group_directory(self, self_id: str) -> GroupDirectory:
+        directory = self.group_directories.get(self_id)
+        if directory is None:
+            directory = GroupDirectory(ttl=self.config.get("group_cache_ttl", 3600))
+            directory.on_change = lambda: self.store.mark_dirty(DIRECTORY_DOCUMENT)
+            self.group_directories[self_id] = directory
+        return directory
+
+    def _snapshot_group_directories(self) -> Dict[str, Any]:
+        return {self_id: directory.to_dict() for self_id, directory in self.group_directories.items()}
+
+    def _restore_group_directories(self, data: Optional[Dict[str, Any]]):
+        if not isinstance(data, dict):
+            return
+        for self_id, directory_data in data.items():
+            if isinstance(directory_data, dict):
+                self._get_group_directory(str(self_id)).restore(directory_data)
+
+    async def _fetch_group_list(self, account: Any) -> List[str]:
+        """通过平台 API 拉取某个账号的群列表，失败或熔断时抛出异常"""
+        breaker = self.breakers.get('get_group_list')
+        breaker.check()
+        start = time_module.perf_counter()
+        try:
+            result = await account.api.call_action('get_group_list')
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        finally:
+            self.metric_action_latency.observe(time_module.perf_counter() - start, action='get_group_list')
+        breaker.record_success()
+        if not isinstance(result, list):
+            raise ValueError(f"获取群列表返回格式异常: {result}")
+        group_ids = [str(g['group_id']) for g in result]
+        logger.info(f"通过平台 API 获取到 {len(group_ids)} 个群聊")
+        return group_ids
+
+    async def _refresh_group_directories(self, force: bool = False):
+        """刷新所有已连接账号的群列表，force=False 时缓存未过期则跳过"""
+        single = len(self.accounts) == 1
+        coros = []
+        for self_id, account in self.accounts.items():
+            # 单账号时直接用 bot_instance 调用，与账号路由前的行为一致
+            bot = self.bot_instance if single else account
+            fetch = lambda bot=bot: self._fetch_group_list(bot)
+            directory = self._get_group_directory(self_id)
+            coros.append(directory.refresh(fetch) if force else directory.get(fetch))
+        await asyncio.gather(*coros)
 
     async def _get_all_groups(self) -> List[str]:
-        """获取所有群聊列表"""
-        if self.bot_instance:
+        """获取所有账号的群聊列表（优先使用缓存，过期时刷新，刷新失败时使用旧缓存）"""
+        await self._refresh_group_directories()
+        # 尚未捕获任何账号时，使用上次保存的群列表
+        self_ids = list(self.accounts) or list(self.group_directories)
+        group_ids = list(dict.fromkeys(
+            group_id for self_id in self_ids for group_id in self._get_group_directory(self_id).groups
+        ))
+        if not group_ids:
+            logger.warning("无法自动获取群聊列表。请确保机器人已收到过消息以初始化，或配置 OneBot 直连地址，或改用白名单模式。")
+        return group_ids
+
+    async def _group_refresh_task(self):
+        """在打卡时间前提前刷新群列表缓存，让打卡时无需等待 get_group_list"""
+        handled = None
+        try:
+            while True:
+                generation = self.timer.generation
+                next_run = self._get_next_run_time()
+                if next_run == handled:
+                    # 本轮已刷新，等本轮打卡时间过去再计算下一轮
+                    await self.timer.sleep_until(next_run, generation)
+                    continue
+
+                lead = timedelta(seconds=self.config.get("group_refresh_lead", 300))
+                if await self.timer.sleep_until(next_run - lead, generation):
+                    continue
+                handled = next_run
+                # 白名单模式下多账号分片也需要群成员关系
+                if not self.config.get("whitelist_mode", False) or len(self.accounts) > 1:
+                    await self._refresh_group_directories(force=True)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"群列表刷新任务异常终止: {e}", exc_info=True)
+
+    async def _check_bot_health(self) -> bool:
+        """检查所有账号是否在线，同时预热到协议端的连接"""
+        if not self.bot_instance:
+            logger.warning("预热: 尚未捕获机器人实例，本次打卡将使用回退方法")
+            return False
+
+        async def _check(self_id: str, bot: Any) -> bool:
             try:
-                result = await self.bot_instance.api.call_action('get_group_list')
-                if isinstance(result, list):
-                    group_ids = [str(g['group_id']) for g in result]
-                    logger.info(f"通过平台 API 获取到 {len(group_ids)} 个群聊")
-                    return group_ids
-                else:
-                    logger.warning(f"获取群列表返回格式异常: {result}")
+                status = await asyncio.wait_for(bot.api.call_action('get_status'), timeout=5)
+                if isinstance(status, dict) and status.get("online") is False:
+                    logger.warning(f"预热: 账号 {self_id} 不在线 {status}")
+                    return False
+                return True
             except Exception as e:
-                logger.error(f"通过平台 API 获取群列表失败: {e}")
-        
-        logger.warning("无法自动获取群聊列表。请确保机器人已收到过消息以初始化，或改用白名单模式。")
-        return []
+                logger.warning(f"预热: 账号 {self_id} 状态检查失败: {e}")
+                return False
+
+        if len(self.accounts) <= 1:
+            return await _check(next(iter(self.accounts), ""), self.bot_instance)
+        results = await asyncio.gather(*(_check(sid, acc) for sid, acc in self.accounts.items()))
+        return all(results)
+
+    async def _prepare_sign_plan(self, slot: time, target_time: datetime) -> Dict[str, Any]:
+        """在打卡时间前准备好该时间点的目标群列表、分散偏移、机器人状态和批次检查点
+
+        返回的计划交给 _execute_sign_plan 执行，不执行时用 _discard_sign_plan 删除检查点
+        """
+        start = time_module.perf_counter()
+        whitelist_mode = self.config.get("whitelist_mode", False)
+        if whitelist_mode:
+            target_groups = list(self.whitelist_groups)
+        else:
+            target_groups = await self._get_all_groups()
+        # 去重并保持顺序，只保留属于该时间点的群
+        total = len(target_groups)
+        target_groups = self.schedule.groups_for(slot, dict.fromkeys(target_groups))
+        offsets = [self.schedule.spread_offset(gid) for gid in target_groups] if self.schedule.spread_seconds else None
+        bot_ready = await self._check_bot_health()
+        checkpoint = None
+        if target_groups:
+            # 检查点在预热阶段创建并落盘，打卡时间到达后只追加完成的群
+            checkpoint = await self.checkpoints.start(
+                target_groups,
+                target_time.toordinal(),
+                kind="scheduled",
+                slot=slot.strftime('%H:%M:%S'),
+                target=target_time.isoformat(),
+            )
+        logger.info(
+            f"打卡预热完成: {slot.strftime('%H:%M:%S')} 时间点 {len(target_groups)} 个目标群，"
+            f"机器人{'就绪' if bot_ready else '未就绪'}，耗时 {(time_module.perf_counter() - start) * 1000:.0f}ms"
+        )
+        return {
+            "slot": slot,
+            "target": target_time,
+            "groups": target_groups,
+            "offsets": offsets,
+            "whitelist_mode": whitelist_mode,
+            "total": total,
+            "checkpoint": checkpoint,
+        }
+
+    async def _discard_sign_plan(self, plan: Dict[str, Any]):
+        """放弃未执行的计划（时间表被修改或任务停止），删除还没有开始的批次的检查点"""
+        if plan["checkpoint"]:
+            await self.checkpoints.release(plan["checkpoint"], completed=True)
+
+    async def _execute_sign_plan(self, plan: Dict[str, Any]):
+        """执行一个时间点的打卡，结束后释放计划的检查点；中途出错或取消时保留，下次启动后继续"""
+        checkpoint = plan["checkpoint"]
+        completed = False
+        try:
+            target_groups = plan["groups"]
+            if target_groups:
+                result = await self._sign_target_groups(target_groups, plan["offsets"], checkpoint)
+                completed = True
+                logger.info(f"打卡完成: {result}")
+                await self.history.compact()
+            elif not plan["total"]:
+                if plan["whitelist_mode"]:
+                    logger.warning("没有可打卡的群组")
+                    await self._notify_admin("自动打卡失败：没有可打卡的群组")
+                else:
+                    logger.warning("没有找到任何群聊，请检查配置或使用白名单模式")
+                    await self._notify_admin("自动打卡失败：没有找到任何群聊")
+            else:
+                logger.info("该时间点没有需要打卡的群组")
+            if plan["total"]:
+                # 拿到了目标群才算完成，否则留给下次启动补打卡
+                self.last_scheduled_runs[plan["slot"].strftime('%H:%M:%S')] = plan["target"].isoformat()
+                self._save_config()
+        except asyncio.CancelledError:
+            logger.info("进行中的打卡批次已取消")
+            raise
+        except Exception as e:
+            logger.error(f"执行打卡批次出错: {e}", exc_info=True)
+            await self._notify_admin(f"自动打卡失败：发生未知错误 {e}")
+        finally:
+            if checkpoint:
+                await self.checkpoints.release(checkpoint, completed)
+
+    def _find_missed_runs(self, now: datetime, resumed: Set[str] = frozenset()) -> List[Tuple[datetime, time]]:
+        """找出宽限期内错过的定时打卡：最近一次应执行时间晚于已完成标记的时间点
+
+        resumed 为正在从检查点继续的定时批次的目标时间，这些时间点不再重复补打卡
+        """
+        grace = timedelta(minutes=max(0, self.config.get("catchup_grace_minutes", 120)))
+        if not grace:
+            return []
+        missed = []
+        for slot in self.schedule.all_slots():
+            target = next_occurrence(slot, now) - timedelta(days=1)
+            if now - target > grace:
+                continue
+            if target.isoformat() in resumed:
+                continue
+            last_run = self.last_scheduled_runs.get(slot.strftime('%H:%M:%S'))
+            try:
+                if last_run and datetime.fromisoformat(last_run) >= target:
+                    continue
+            except ValueError:
+                pass
+            missed.append((target, slot))
+        return sorted(missed)
+
+    async def _wait_for_account(self, timeout: Optional[float]) -> bool:
+        """等待第一个账号登记（捕获到 aiocqhttp 实例或直连客户端就绪），超时返回 False；timeout=None 一直等待"""
+        if self.accounts:
+            return True
+        try:
+            await asyncio.wait_for(self._account_ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _claim_interrupted_batches(self) -> List[BatchCheckpoint]:
+        """取出今天中断的批次；预热时创建、打卡时间还没到的定时批次从未开始，删除后交给正常调度"""
+        now = self._get_local_time()
+        pending = []
+        for checkpoint in await self.checkpoints.claim_pending(self._today()):
+            try:
+                not_started = checkpoint.kind == "scheduled" and datetime.fromisoformat(checkpoint.target) > now
+            except (TypeError, ValueError):
+                not_started = False
+            if not_started:
+                await self.checkpoints.release(checkpoint, completed=True)
+            else:
+                pending.append(checkpoint)
+        return pending
+
+    async def _start_catchup(self):
+        """插件启动时在后台继续中断的批次并补打错过的时间点；之后重新开启自动打卡不再补打"""
+        pending = await self._claim_interrupted_batches()
+        resumed = {checkpoint.target for checkpoint in pending if checkpoint.kind == "scheduled"}
+        missed = self._find_missed_runs(self._get_local_time(), resumed)
+        if pending or missed:
+            run_task = asyncio.create_task(self._run_catchup(pending, missed))
+            self._run_tasks.add(run_task)
+            run_task.add_done_callback(self._run_tasks.discard)
+
+    async def _run_catchup(self, pending: List[BatchCheckpoint], missed: List[Tuple[datetime, time]]):
+        """先继续中断的批次，再依次补打错过的时间点；和正常打卡一样经过调度器限速，今天已打卡的群会跳过
+
+        重启后还没有可用账号时，补打卡只能走发送消息的回退方式，
+        因此先等待账号登记，超过补打卡宽限期仍未登记则放弃，检查点保留到下次启动。
+        宽限期为 0 时没有错过的时间点需要补打，中断的批次一直等到账号登记后继续。
+        取出的检查点由这里释放：完成的删除，放弃或中途取消的保留
+        """
+        grace = timedelta(minutes=max(0, self.config.get("catchup_grace_minutes", 120)))
+        pending = list(pending)
+        try:
+            if not self.accounts:
+                logger.info("补打卡等待机器人账号连接...")
+                if not await self._wait_for_account(grace.total_seconds() or None):
+                    logger.warning(f"{grace.total_seconds() / 60:.0f} 分钟内未连接机器人账号，放弃本次补打卡")
+                    return
+            while pending:
+                checkpoint = pending[0]
+                remaining = checkpoint.remaining()
+                logger.info(
+                    f"继续未完成的打卡批次 {checkpoint.id}: 已完成 {len(checkpoint.done)} 个，剩余 {len(remaining)} 个"
+                )
+                result = await self._sign_target_groups(remaining, checkpoint=checkpoint)
+                pending.pop(0)
+                await self.checkpoints.release(checkpoint, completed=True)
+                logger.info(f"中断的打卡批次已完成: {result}")
+                if checkpoint.kind == "scheduled" and checkpoint.slot and checkpoint.target:
+                    self.last_scheduled_runs[checkpoint.slot] = checkpoint.target
+                    self._save_config()
+        finally:
+            for checkpoint in pending:
+                await self.checkpoints.release(checkpoint, completed=False)
+        for target_time, slot in missed:
+            if self._get_local_time() - target_time > grace:
+                logger.info(f"补打卡: {target_time.strftime('%Y-%m-%d %H:%M:%S')} 已超过宽限期，跳过")
+                continue
+            logger.info(
+                f"补打卡: {target_time.strftime('%Y-%m-%d %H:%M:%S')} 的定时打卡未完成，"
+                f"已延迟 {(self._get_local_time() - target_time).total_seconds() / 60:.0f} 分钟"
+            )
+            await self._execute_sign_plan(await self._prepare_sign_plan(slot, target_time))
 
     async def _daily_sign_task(self):
-        """每日定时打卡任务"""
+        """每日定时打卡任务：按时间表维护下次触发时间的最小堆"""
+        consecutive_errors = 0
+        heap: List = []
         try:
             while not self._stop_event.is_set():
-                # 将内部的 try...except Exception 块保持原样，以处理循环内的特定错误
                 try:
-                    now = self._get_local_time()
-                    target_time = now.replace(
-                        hour=self.sign_time.hour,
-                        minute=self.sign_time.minute,
-                        second=self.sign_time.second,
-                        microsecond=0
-                    )
-                    
-                    if now >= target_time:
-                        target_time += timedelta(days=1)
-                    
-                    wait_seconds = (target_time - now).total_seconds()
-                    if wait_seconds > 86400:
-                        logger.warning(f"等待时间异常长: {wait_seconds}秒，重置为明天")
-                        target_time = now.replace(
-                            hour=self.sign_time.hour,
-                            minute=self.sign_time.minute,
-                            second=self.sign_time.second,
-                            microsecond=0
-                        ) + timedelta(days=1)
-                        wait_seconds = (target_time - now).total_seconds()
-                    
+                    if not heap:
+                        # 记录建堆时的时间表代数，之后（包括预热期间）修改时间表都会让等待立即返回
+                        generation = self.timer.generation
+                        now = self._get_local_time()
+                        heap = [(next_occurrence(slot, now), slot) for slot in self.schedule.all_slots()]
+                        heapq.heapify(heap)
+
+                    target_time, slot = heap[0]
+                    wait_seconds = (target_time - self._get_local_time()).total_seconds()
                     logger.info(f"距离下次打卡还有 {wait_seconds:.1f}秒 (将在 {target_time} 执行)")
                     
+                    # 预热阶段：提前解析目标群、检查机器人状态，打卡时间一到立即发出请求
+                    prewarm = timedelta(seconds=max(0, self.config.get("prewarm_seconds", 30)))
+                    if await self.timer.sleep_until(target_time - prewarm, generation):
+                        heap = []  # 时间表被修改或收到停止信号，重建最小堆
+                        continue
+                    plan = await self._prepare_sign_plan(slot, target_time)
                     try:
-                        await asyncio.wait_for(self._stop_event.wait(), timeout=wait_seconds)
-                        if self._stop_event.is_set():
-                            break
-                    except asyncio.TimeoutError:
-                        pass
-                    
-                    logger.info("开始执行每日打卡...")
+                        interrupted = await self.timer.sleep_until(target_time, generation)
+                    except asyncio.CancelledError:
+                        await self._discard_sign_plan(plan)
+                        raise
+                    if interrupted:
+                        await self._discard_sign_plan(plan)
+                        heap = []
+                        continue
                     
-                    # 确定要打卡的群组
-                    if self.config.get("whitelist_mode", False):
-                        target_groups = self.whitelist_groups
-                    else:
-                        target_groups = await self._get_all_groups()
-                        if not target_groups:
-                            logger.warning("没有找到任何群聊，请检查配置或使用白名单模式")
-                            await self._notify_admin("自动打卡失败：没有找到任何群聊")
-                    
-                    if target_groups:
-                        result = await self._sign_target_groups(target_groups)
-                        logger.info(f"打卡完成: {result}")
-                    else:
-                        logger.warning("没有可打卡的群组")
-                        await self._notify_admin("自动打卡失败：没有可打卡的群组")
-                    
-                    await asyncio.sleep(1)  # 防止CPU占用过高
+                    skew = self.timer.record_skew(target_time)
+                    logger.info(
+                        f"开始执行每日打卡 {slot.strftime('%H:%M:%S')}... (触发偏差 {skew * 1000:+.1f}ms)"
+                    )
+                    heapq.heapreplace(heap, (target_time + timedelta(days=1), slot))
+                    # 分散窗口内的批次可能持续数分钟，放到后台执行，不阻塞下一个时间点
+                    run_task = asyncio.create_task(self._execute_sign_plan(plan))
+                    self._run_tasks.add(run_task)
+                    run_task.add_done_callback(self._run_tasks.discard)
+                    consecutive_errors = 0
                 
-                except aiohttp.ClientError as e:
-                    logger.error(f"自动打卡任务网络错误: {e}", exc_info=True)
-                    await self._notify_admin(f"自动打卡失败：网络错误 {e}")
-                    await asyncio.sleep(300)  # 网络问题，等待更长时间
                 except Exception as e:
-                    logger.error(f"自动打卡任务内部循环出错: {e}", exc_info=True)
-                    await self._notify_admin(f"自动打卡失败：发生未知错误 {e}")
-                    await asyncio.sleep(60)  # 其他错误，等待60秒
+                    # 连续出错时按指数退避，等待期间修改打卡时间或停止会立即唤醒
+                    consecutive_errors += 1
+                    heap = []
+                    generation = self.timer.generation
+                    delay = min(
+                        self.config.get("error_retry_delay", 60) * 2 ** (consecutive_errors - 1),
+                        1800
+                    )
+                    kind = "网络错误" if isinstance(e, ClientError) else "发生未知错误"
+                    logger.error(f"自动打卡任务{kind}: {e}，{delay} 秒后重试", exc_info=True)
+                    await self._notify_admin(f"自动打卡失败：{kind} {e}")
+                    await self.timer.sleep_until(self._get_local_time() + timedelta(seconds=delay), generation)
         except asyncio.CancelledError:
             logger.info("自动打卡任务被取消")
             # 任务被取消时，安静退出即可，无需重新抛出
         except Exception as e:
             logger.error(f"自动打卡任务异常终止: {e}", exc_info=True)
 
+    async def _cancel_running_batches(self):
+        """取消后台正在执行的打卡批次"""
+        tasks = list(self._run_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     @filter.event_message_type(filter.EventMessageType.ALL, priority=999)
     async def _capture_bot_instance(self, event: AstrMessageEvent):
-        """捕获机器人实例用于后台任务"""
-        if self.bot_instance is None and event.get_platform_name() == "aiocqhttp":
+        """捕获所有账号的机器人实例用于后台任务"""
+        if event.get_platform_name() == "aiocqhttp" and str(event.get_self_id()) not in self.accounts:
             try:
                 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import AiocqhttpMessageEvent
                 if isinstance(event, AiocqhttpMessageEvent):
-                    self.bot_instance = event.bot
-                    self.platform_name = "aiocqhttp"
-                    logger.info("成功捕获 aiocqhttp 机器人实例，后台 API 调用已启用。")
+                    self_id = str(event.get_self_id())
+                    self.accounts[self_id] = BotAccount(self_id, event.bot)
+                    self._account_ready.set()
+                    if self.bot_instance is None:
+                        self.bot_instance = event.bot
+                        self.platform_name = "aiocqhttp"
+                    logger.info(
+                        f"成功捕获 aiocqhttp 机器人实例 (账号 {self_id})，后台 API 调用已启用。"
+                        f"当前共 {len(self.accounts)} 个账号"
+                    )
             except ImportError:
                 logger.warning("无法导入 AiocqhttpMessageEvent，后台 API 调用可能受限。")
         # 这是一个后台捕获任务，不需要返回任何消息
 
     @filter.command("打卡", alias=["群打卡"])
-    async def group_sign(self, event: AstrMessageEvent):
-        """在当前群聊执行打卡"""
+    async def group_sign(self, event: AstrMessageEvent, option: str = ""):
+        """在当前群聊执行打卡，今天已打卡时跳过，加参数 强制 可重新打卡"""
         await self._initialized.wait()
         try:
             # 获取当前群聊ID
@@ -388,15 +1242,27 @@ class QQGroupSignPlugin(Star):
             if not group_id:
                 yield event.chain_result([Plain("❌ 请在群聊中使用此命令")])
                 return
+
+            force = str(option).strip().lower() in FORCE_OPTIONS
+            if not self._skip_signed_today([str(group_id)], force=force)[0]:
+                yield event.chain_result([Plain("✅ 本群今天已打卡，如需重新打卡请使用 /打卡 强制")])
+                return
             
-            result = await self._perform_group_sign(group_id)
+            # 多账号时由收到命令的账号执行打卡
+            account = self.accounts.get(str(event.get_self_id())) if len(self.accounts) > 1 else None
+            result = await self._perform_group_sign(group_id, account)
             
             if result["success"]:
                 # 更新统计信息
                 self.sign_statistics["total_signs"] += 1
                 self.sign_statistics["success_count"] += 1
                 self.sign_statistics["last_sign_time"] = datetime.now().isoformat()
-                await self._save_config()
+                self._save_config()
+                self.ledger.mark(group_id, self._today())
+                self.store.mark_dirty(LEDGER_DOCUMENT)
+                if group_id in self.retry_queue:
+                    self.retry_queue.discard(group_id)
+                    self.store.mark_dirty(RETRY_DOCUMENT)
                 
                 yield event.chain_result([Plain(f"✅ 打卡成功")])
                 
@@ -405,7 +1271,9 @@ class QQGroupSignPlugin(Star):
             else:
                 self.sign_statistics["total_signs"] += 1
                 self.sign_statistics["fail_count"] += 1
-                await self._save_config()
+                self._save_config()
+                if self._schedule_retry(group_id, result.get("error_class"), result["message"]):
+                    self.store.mark_dirty(RETRY_DOCUMENT)
                 
                 yield event.chain_result([Plain(f"❌ 打卡失败: {result['message']}")])
                 await self._notify_admin(f"群 {group_id} 手动打卡失败: {result['message']}")
@@ -416,8 +1284,8 @@ class QQGroupSignPlugin(Star):
             yield event.chain_result([Plain(error_msg)])
 
     @filter.command("全群打卡", alias=["打卡所有群"])
-    async def sign_all_groups(self, event: AstrMessageEvent):
-        """打卡所有群聊"""
+    async def sign_all_groups(self, event: AstrMessageEvent, option: str = ""):
+        """打卡所有群聊，今天已打卡的群会跳过，加参数 强制 可全部重新打卡"""
         await self._initialized.wait()
         try:
             # 获取所有群聊列表
@@ -430,10 +1298,38 @@ class QQGroupSignPlugin(Star):
                 yield event.chain_result([Plain("❌ 没有可打卡的群组，请先配置白名单群组")])
                 return
             
-            yield event.chain_result([Plain(f"🔄 正在为所有群组执行打卡（共 {len(target_groups)} 个群）...")])
+            force = str(option).strip().lower() in FORCE_OPTIONS
+            target_groups, _, skipped = self._skip_signed_today(list(target_groups), force=force)
+            if not target_groups:
+                yield event.chain_result([
+                    Plain(f"✅ {skipped} 个群今天都已打卡，如需重新打卡请使用 /全群打卡 强制")
+                ])
+                return
+
+            total = len(target_groups)
+            skipped_msg = f"，今天已打卡跳过 {skipped} 个" if skipped else ""
+            yield event.chain_result([Plain(f"🔄 正在为所有群组执行打卡（共 {total} 个群{skipped_msg}）...")])
             
-            result = await self._sign_target_groups(target_groups)
-            yield event.chain_result([Plain(result)])
+            # 边打卡边汇报进度，结束后发送统计，失败明细分页发送
+            interval = self.config.get("progress_interval_seconds", 10)
+            last_report = time_module.monotonic()
+            tally = BatchTally()
+            checkpoint = await self.checkpoints.start(target_groups, self._today())
+            completed = False
+            try:
+                async for group_id, result in self._iter_sign_results(target_groups, checkpoint=checkpoint):
+                    tally.add(group_id, result)
+                    done = tally.total
+                    if interval > 0 and done < total and time_module.monotonic() - last_report >= interval:
+                        last_report = time_module.monotonic()
+                        yield event.chain_result([Plain(f"⏳ 打卡进度: {done}/{total}，失败 {tally.failed} 个")])
+                completed = True
+            finally:
+                await self.checkpoints.release(checkpoint, completed)
+
+            yield event.chain_result([Plain(await self._finish_batch(total, tally, skipped))])
+            for page in self._format_failure_pages(tally):
+                yield event.chain_result([Plain(page)])
             
         except Exception as e:
             error_msg = f"❌ 全群打卡失败: {str(e)}"
@@ -447,22 +1343,31 @@ class QQGroupSignPlugin(Star):
 📋 QQ群打卡插件指令菜单
 
 🎯 基础打卡指令：
-• /打卡 - 在当前群聊执行打卡
-• /全群打卡 - 对所有群聊执行打卡
+• /打卡 [强制] - 在当前群聊执行打卡（今天已打卡时跳过，加“强制”重新打卡）
+• /全群打卡 [强制] - 对所有群聊执行打卡（跳过今天已打卡的群）
 
 ⚙️ 自动打卡设置：
 • /开启自动打卡 - 启动定时自动打卡
 • /关闭自动打卡 - 停止定时自动打卡
 • /设置打卡时间 [时间] - 设置打卡时间（格式：HH:MM:SS）
+• /设置群打卡时间 [群号] [时间] - 为单个群设置独立打卡时间
+• /清除群打卡时间 [群号] - 清除单个群的独立打卡时间
+• /打卡计划 - 查看打卡时间表
+• /模拟打卡 [时间点] [白名单/全群] [速率=N] [并发=N] - 按历史耗时估算下次打卡需要多久，不调用接口
 • /打卡状态 - 查看打卡状态和统计信息
 
 📝 白名单管理：
-• /添加白名单 [群号] - 添加群号到白名单
+• /添加白名单 [群号] [优先级] - 添加群号到白名单，可指定优先级（高/普通/低）
 • /移除白名单 [群号] - 从白名单移除群号
-• /查看白名单 - 查看白名单列表
+• /批量添加白名单 [群号...|文件名] - 一次添加多个群号，可粘贴列表或读取数据目录中的文件
+• /批量移除白名单 [群号...|文件名] - 一次移除多个群号
+• /导出白名单 - 把白名单导出到数据目录中的文件
+• /查看白名单 [页码] - 分页查看白名单列表
+• /设置群优先级 [群号] [高/普通/低] - 设置群的打卡优先级
 • /切换模式 - 切换白名单/全群模式
 
 📊 其他功能：
+• /打卡失败群 [天数] - 查看连续多天打卡失败的群（默认3天）
 • /打卡菜单 - 显示此帮助菜单
 
 💡 使用提示：
@@ -473,18 +1378,26 @@ class QQGroupSignPlugin(Star):
         yield event.chain_result([Plain(menu_text)])
 
     @filter.command("添加白名单", alias=["加白名单"])
-    async def add_whitelist(self, event: AstrMessageEvent, group_id: str):
-        """添加群号到白名单"""
+    async def add_whitelist(self, event: AstrMessageEvent, group_id: str, priority: str = ""):
+        """添加群号到白名单，可同时指定优先级（高/普通/低）"""
         await self._initialized.wait()
         try:
             group_id = group_id.strip()
-            if group_id not in self.whitelist_groups:
-                self.whitelist_groups.append(group_id)
-                await self._save_config()
+            priority = priority.strip()
+            if priority and priority not in PRIORITY_NAMES:
+                yield event.chain_result([Plain(f"❌ 优先级只能是: {'/'.join(PRIORITY_NAMES)}")])
+                return
+            if priority:
+                self._set_group_priority(group_id, PRIORITY_NAMES[priority])
+            if self.whitelist_groups.add(group_id):
+                self._save_config()
                 yield event.chain_result([Plain(
                     f"✅ 已添加群号 {group_id} 到白名单\n"
-                    f"📋 当前白名单: {', '.join(self.whitelist_groups)}"
+                    f"📋 白名单共 {len(self.whitelist_groups)} 个群"
                 )])
+            elif priority:
+                self._save_config()
+                yield event.chain_result([Plain(f"✅ 群号 {group_id} 已在白名单中，优先级设为 {priority}")])
             else:
                 yield event.chain_result([Plain(f"ℹ️ 群号 {group_id} 已在白名单中")])
         except Exception as e:
@@ -496,33 +1409,152 @@ class QQGroupSignPlugin(Star):
         await self._initialized.wait()
         try:
             group_id = group_id.strip()
-            if group_id in self.whitelist_groups:
-                self.whitelist_groups.remove(group_id)
-                await self._save_config()
+            if self.whitelist_groups.discard(group_id):
+                self._save_config()
                 yield event.chain_result([Plain(
                     f"✅ 已从白名单移除群号 {group_id}\n"
-                    f"📋 当前白名单: {', '.join(self.whitelist_groups) if self.whitelist_groups else '无'}"
+                    f"📋 白名单共 {len(self.whitelist_groups)} 个群"
                 )])
             else:
                 yield event.chain_result([Plain(f"ℹ️ 群号 {group_id} 不在白名单中")])
         except Exception as e:
             yield event.chain_result([Plain(f"❌ 移除失败: {e}")])
 
+    async def _read_bulk_group_ids(self, event: AstrMessageEvent) -> Tuple[List[str], List[str]]:
+        """解析批量命令的参数：数字视为群号，其他内容视为数据目录中的文件名，返回 (群号, 读取失败的文件)"""
+        parts = (event.message_str or "").strip().split(maxsplit=1)
+        text = parts[1] if len(parts) > 1 else ""
+        group_ids: List[str] = []
+        missing = []
+        for token in text.split():
+            if not re.sub(r"[\d,，;；、]+", "", token):
+                group_ids.extend(parse_group_ids(token))
+                continue
+            # 只允许读取数据目录下的文件
+            path = self.plugin_data_dir / Path(token).name
+            try:
+                content = await asyncio.to_thread(path.read_text, encoding='utf-8')
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"读取白名单文件 {path} 失败: {e}")
+                missing.append(token)
+                continue
+            group_ids.extend(parse_group_ids(content))
+        return list(dict.fromkeys(group_ids)), missing
+
+    @filter.command("批量添加白名单", alias=["导入白名单"])
+    async def bulk_add_whitelist(self, event: AstrMessageEvent):
+        """一次添加多个群号到白名单：命令后粘贴群号列表，或给出数据目录中的文件名"""
+        await self._initialized.wait()
+        group_ids, missing = await self._read_bulk_group_ids(event)
+        if not group_ids:
+            note = f"（文件读取失败: {', '.join(missing)}）" if missing else ""
+            yield event.chain_result([Plain(f"❌ 没有找到群号{note}，用法: /批量添加白名单 群号1 群号2 ... 或 文件名")])
+            return
+        added = self.whitelist_groups.update(group_ids)
+        if added:
+            self._save_config()
+        message = (
+            f"✅ 批量添加完成: 新增 {len(added)} 个，已存在 {len(group_ids) - len(added)} 个\n"
+            f"➕ 新增: {format_preview(added, WHITELIST_PREVIEW)}\n"
+            f"📋 白名单共 {len(self.whitelist_groups)} 个群"
+        )
+        if missing:
+            message += f"\n⚠️ 文件读取失败: {', '.join(missing)}"
+        yield event.chain_result([Plain(message)])
+
+    @filter.command("批量移除白名单", alias=["批量删白名单"])
+    async def bulk_remove_whitelist(self, event: AstrMessageEvent):
+        """一次从白名单移除多个群号，参数格式同批量添加"""
+        await self._initialized.wait()
+        group_ids, missing = await self._read_bulk_group_ids(event)
+        if not group_ids:
+            note = f"（文件读取失败: {', '.join(missing)}）" if missing else ""
+            yield event.chain_result([Plain(f"❌ 没有找到群号{note}，用法: /批量移除白名单 群号1 群号2 ... 或 文件名")])
+            return
+        removed = self.whitelist_groups.remove_many(group_ids)
+        if removed:
+            self._save_config()
+        message = (
+            f"✅ 批量移除完成: 移除 {len(removed)} 个，不在白名单 {len(group_ids) - len(removed)} 个\n"
+            f"➖ 移除: {format_preview(removed, WHITELIST_PREVIEW)}\n"
+            f"📋 白名单共 {len(self.whitelist_groups)} 个群"
+        )
+        if missing:
+            message += f"\n⚠️ 文件读取失败: {', '.join(missing)}"
+        yield event.chain_result([Plain(message)])
+
+    @filter.command("导出白名单")
+    async def export_whitelist(self, event: AstrMessageEvent):
+        """把白名单按每行一个群号导出到数据目录，可再用批量添加导入"""
+        await self._initialized.wait()
+        path = self.plugin_data_dir / "whitelist_export.txt"
+        try:
+            await asyncio.to_thread(
+                write_atomic, path, "".join(f"{group_id}\n" for group_id in self.whitelist_groups)
+            )
+        except OSError as e:
+            yield event.chain_result([Plain(f"❌ 导出失败: {e}")])
+            return
+        yield event.chain_result([Plain(f"✅ 已导出 {len(self.whitelist_groups)} 个群号到 {path}")])
+
+    def _set_group_priority(self, group_id: str, priority: int):
+        if priority == PRIORITY_NORMAL:
+            self.group_priorities.pop(group_id, None)
+        else:
+            self.group_priorities[group_id] = priority
+
+    def _format_priority_tiers(self) -> str:
+        """按优先级列出单独设置了优先级的群"""
+        tiers: Dict[int, List[str]] = {}
+        for group_id, priority in self.group_priorities.items():
+            tiers.setdefault(priority, []).append(group_id)
+        return "\n".join(
+            f"⭐ {PRIORITY_LABELS.get(priority, priority)}优先级: {', '.join(groups)}"
+            for priority, groups in sorted(tiers.items())
+        )
+
+    @filter.command("设置群优先级", alias=["群优先级"])
+    async def set_group_priority(self, event: AstrMessageEvent, group_id: str, priority: str):
+        """设置群的打卡优先级：高优先级先打卡且不受时间预算限制，低优先级在预算用完时推迟"""
+        await self._initialized.wait()
+        group_id = str(group_id).strip()
+        priority = str(priority).strip()
+        if priority not in PRIORITY_NAMES:
+            yield event.chain_result([Plain(f"❌ 优先级只能是: {'/'.join(PRIORITY_NAMES)}")])
+            return
+        self._set_group_priority(group_id, PRIORITY_NAMES[priority])
+        self._save_config()
+        yield event.chain_result([Plain(f"✅ 群 {group_id} 的打卡优先级已设为 {priority}")])
+
     @filter.command("查看白名单", alias=["白名单列表"])
-    async def view_whitelist(self, event: AstrMessageEvent):
-        """查看白名单列表"""
+    async def view_whitelist(self, event: AstrMessageEvent, page: int = 1):
+        """分页查看白名单列表"""
         await self._initialized.wait()
         if self.whitelist_groups:
-            message = f"📋 当前白名单群组:\n{', '.join(self.whitelist_groups)}"
+            try:
+                page = int(page)
+            except (TypeError, ValueError):
+                page = 1
+            groups, pages = self.whitelist_groups.page(page, WHITELIST_PAGE_SIZE)
+            page = min(max(1, page), pages)
+            message = (
+                f"📋 白名单群组 共 {len(self.whitelist_groups)} 个 (第 {page}/{pages} 页):\n{', '.join(groups)}"
+            )
+            if page < pages:
+                message += f"\n👉 下一页: /查看白名单 {page + 1}"
+            tiers = self._format_priority_tiers()
+            if tiers and page == 1:
+                message += f"\n{tiers}"
         else:
             message = "📋 当前白名单为空"
         yield event.chain_result([Plain(message)])
 
     @filter.command("打卡状态", alias=["打卡统计"])
     async def sign_status(self, event: AstrMessageEvent):
-        """查看打卡状态和统计"""
-        await self._initialized.wait()
+        """查看打卡状态和统计；数据尚未加载完成时也立即返回，并注明统计可能不完整"""
         status = "🟢 自动打卡已开启" if self.is_active else "🔴 自动打卡已停止"
+        if not self._initialized.is_set():
+            status += "\n⏳ 数据加载中，统计和时间表可能不完整"
         mode = "📝 白名单模式" if self.config.get("whitelist_mode", False) else "🌐 全群模式"
         
         # 计算下次打卡时间
@@ -534,17 +1566,59 @@ class QQGroupSignPlugin(Star):
         
         if stats['last_sign_time']:
             stats_msg += f"\n上次打卡: {stats['last_sign_time']}"
+        breaker_summary = self.breakers.summary()
         
         message = [
             Plain(f"{status}\n"),
             Plain(f"{mode}\n"),
+            Plain(f"🤖 已连接账号: {len(self.accounts)} 个\n" if len(self.accounts) > 1 else ""),
             Plain(f"⏰ 打卡时间: {self.sign_time.strftime('%H:%M:%S')} (UTC+{self.config.get('timezone', 8)})\n"),
             Plain(f"{stats_msg}\n"),
             Plain(f"⏱ 下次打卡: {target_time.strftime('%Y-%m-%d %H:%M:%S')}\n"),
-            Plain(f"⏳ 距离下次打卡还有 {wait_seconds:.1f} 秒")
+            Plain(f"⏳ 距离下次打卡还有 {wait_seconds:.1f} 秒\n"),
+            Plain(
+                f"🎯 上次触发偏差: {self.timer.last_skew * 1000:+.1f}ms\n"
+                if self.timer.last_skew is not None else ""
+            ),
+            Plain(
+                f"🚀 启动耗时: {sum(self.startup_timings.values()) * 1000:.0f}ms\n"
+                if self._initialized.is_set() else ""
+            ),
+            Plain(
+                f"💾 持久化: 写入 {self.store.writes} 次，合并 {self.store.writes_coalesced} 次，"
+                f"上次耗时 {self.store.last_flush_latency * 1000:.1f}ms"
+            ),
+            Plain(f"\n🔌 熔断器: {breaker_summary}" if breaker_summary else ""),
+            Plain(
+                f"\n🐢 慢群: {self.latency.slow_count()} 个，慢速通道并发 {self.slow_dispatcher.concurrency}"
+                if self.latency.slow_count() else ""
+            ),
+            Plain(
+                f"\n📨 管理员通知: {self.notifier.events} 条合并为 {self.notifier.messages_sent} 条消息"
+                if self.notifier and self.notifier.events else ""
+            ),
+            Plain(self._metrics_summary()),
         ]
         yield event.chain_result(message)
 
+    @filter.command("打卡失败群", alias=["连续失败群"])
+    async def failing_groups(self, event: AstrMessageEvent, days: int = 3):
+        """查看连续多天打卡失败的群"""
+        await self._initialized.wait()
+        try:
+            days = max(1, int(days))
+            groups = await self.history.failing_groups(days)
+        except Exception as e:
+            yield event.chain_result([Plain(f"❌ 查询失败: {e}")])
+            return
+        if groups:
+            preview = ", ".join(groups[:50])
+            more = f"\n... 共 {len(groups)} 个" if len(groups) > 50 else ""
+            message = f"⚠️ 连续 {days} 天打卡失败的群 ({len(groups)} 个):\n{preview}{more}"
+        else:
+            message = f"✅ 没有连续 {days} 天打卡失败的群"
+        yield event.chain_result([Plain(message)])
+
     @filter.command("开启自动打卡", alias=["启动打卡"])
     async def start_auto_sign(self, event: AstrMessageEvent):
         """开启自动打卡"""
@@ -568,6 +1642,7 @@ class QQGroupSignPlugin(Star):
         await self._initialized.wait()
         if self.is_active:
             self._stop_event.set()
+            self.timer.interrupt()
             self.is_active = False
             self.config["enable_auto_sign"] = False
             self.config.save_config()
@@ -582,6 +1657,7 @@ class QQGroupSignPlugin(Star):
                     logger.error(f"取消任务时出错: {e}")
                 finally:
                     self.task = None
+            await self._cancel_running_batches()
                     
             yield event.chain_result([Plain("🛑 自动打卡已停止")])
         else:
@@ -599,6 +1675,8 @@ class QQGroupSignPlugin(Star):
             self.sign_time = time(hour, minute, second)
             self.config["sign_time"] = time_str
             self.config.save_config()
+            # 立即按新时间重新调度
+            self._reschedule()
             
             yield event.chain_result([Plain(
                 f"✅ 打卡时间已设置为 {time_str}\n"
@@ -607,10 +1685,172 @@ class QQGroupSignPlugin(Star):
         except Exception as e:
             yield event.chain_result([Plain(f"❌ 时间格式错误，请使用 HH:MM:SS 格式，例如 08:00:00")])
 
+    @filter.command("设置群打卡时间", alias=["群打卡时间"])
+    async def set_group_sign_time(self, event: AstrMessageEvent, group_id: str, time_str: str):
+        """为单个群设置独立的打卡时间"""
+        await self._initialized.wait()
+        try:
+            parse_time_str(time_str)
+        except ValueError:
+            yield event.chain_result([Plain("❌ 时间格式错误，请使用 HH:MM:SS 格式，例如 08:00:00")])
+            return
+        group_id = str(group_id).strip()
+        self.group_schedules[group_id] = time_str.strip()
+        self._save_config()
+        self._reschedule()
+        yield event.chain_result([Plain(f"✅ 群 {group_id} 将在每天 {time_str.strip()} 单独打卡")])
+
+    @filter.command("清除群打卡时间")
+    async def clear_group_sign_time(self, event: AstrMessageEvent, group_id: str):
+        """清除单个群的独立打卡时间"""
+        await self._initialized.wait()
+        group_id = str(group_id).strip()
+        if self.group_schedules.pop(group_id, None) is None:
+            yield event.chain_result([Plain(f"ℹ️ 群 {group_id} 没有单独设置打卡时间")])
+            return
+        self._save_config()
+        self._reschedule()
+        yield event.chain_result([Plain(f"✅ 已清除群 {group_id} 的独立打卡时间")])
+
+    @filter.command("打卡计划", alias=["打卡时间表"])
+    async def view_schedule(self, event: AstrMessageEvent):
+        """查看打卡时间表"""
+        await self._initialized.wait()
+        now = self._get_local_time()
+        lines = ["🗓 打卡时间表:"]
+        for slot in self.schedule.all_slots():
+            kind = "时间点" if slot in self.schedule.slots else "单独设置"
+            lines.append(
+                f"• {slot.strftime('%H:%M:%S')} ({kind}) 下次: {next_occurrence(slot, now).strftime('%m-%d %H:%M:%S')}"
+            )
+        if self.schedule.spread_seconds:
+            lines.append(f"🔀 每个时间点内分散到 {self.schedule.spread_seconds // 60} 分钟")
+        if self.group_schedules:
+            lines.append(f"📌 单独设置时间的群: {len(self.group_schedules)} 个")
+        yield event.chain_result([Plain("\n".join(lines))])
+
+    def _simulation_lanes(self, groups: List[str], rate: float, concurrency: int) -> List[Any]:
+        """按实际打卡的分片和慢速通道规则构造模拟通道；多账号时使用缓存的群列表分片，不刷新"""
+        from .simulator import SimLane
+
+        if len(self.accounts) <= 1:
+            shards = {None: list(range(len(groups)))}
+        else:
+            memberships = {self_id: self._get_group_directory(self_id) for self_id in self.accounts}
+            shards = shard_groups(groups, memberships, next(iter(self.accounts)))
+        spread = bool(self.schedule.spread_seconds)
+        lanes = []
+        for self_id, indices in shards.items():
+            bucket = TokenMeter(rate, self.config.get("sign_rate_burst", 10))
+            fast, slow = [], []
+            for i in indices:
+                item = (
+                    groups[i],
+                    self.group_priorities.get(groups[i], PRIORITY_NORMAL),
+                    self.schedule.spread_offset(groups[i]) if spread else 0.0,
+                )
+                (slow if self.latency.is_slow(groups[i]) else fast).append(item)
+            name = self_id or "默认"
+            lanes.append(SimLane(name, fast, concurrency, bucket, adaptive=self.config.get("adaptive_backoff", True)))
+            if slow:
+                lanes.append(SimLane(
+                    f"{name}-慢速", slow, self.config.get("slow_lane_concurrency", 2), bucket, adaptive=False
+                ))
+        return lanes
+
+    @filter.command("模拟打卡", alias=["打卡模拟"])
+    async def simulate_sign(self, event: AstrMessageEvent):
+        """模拟下一次定时打卡：用实际目标群和打卡历史中的耗时估算完成时间，不调用打卡接口
+
+        可选参数用于评估修改配置后的效果：时间点 HH:MM:SS、白名单/全群、速率=N、并发=N
+        """
+        await self._initialized.wait()
+        now = self._get_local_time()
+        slot = None
+        whitelist_mode = self.config.get("whitelist_mode", False)
+        rate = float(self.config.get("sign_rate_limit", 5.0))
+        concurrency = int(self.config.get("sign_concurrency", 10))
+        for token in (event.message_str or "").split()[1:]:
+            key, _, value = token.partition("=")
+            try:
+                if token in ("白名单", "全群"):
+                    whitelist_mode = token == "白名单"
+                elif key in ("速率", "rate") and value:
+                    rate = float(value)
+                elif key in ("并发", "concurrency") and value:
+                    concurrency = max(1, int(value))
+                else:
+                    slot = parse_time_str(token)
+            except ValueError:
+                yield event.chain_result([Plain(
+                    f"❌ 无法识别参数 {token}，用法: /模拟打卡 [HH:MM:SS] [白名单/全群] [速率=N] [并发=N]"
+                )])
+                return
+
+        if slot is None:
+            slot = min(self.schedule.all_slots(), key=lambda s: next_occurrence(s, now))
+        # 不在时间表中的时间点按“把打卡时间改为该时间”估算，即主时间点的群改到该时间打卡
+        groups_slot = slot if slot in self.schedule.all_slots() else self.sign_time
+        target = next_occurrence(slot, now)
+        groups = list(self.whitelist_groups) if whitelist_mode else await self._get_all_groups()
+        groups = self.schedule.groups_for(groups_slot, dict.fromkeys(groups))
+        if not groups:
+            yield event.chain_result([Plain(f"ℹ️ {slot.strftime('%H:%M:%S')} 时间点没有需要打卡的群")])
+            return
+
+        from .simulator import LatencyModel, format_duration, simulate
+
+        model = LatencyModel(await self.history.latency_profile())
+        lanes = self._simulation_lanes(groups, rate, concurrency)
+        budget_minutes = self.config.get("sign_time_budget_minutes", 0)
+        report = simulate(
+            lanes, model.latency, model.failure,
+            deadline=budget_minutes * 60 if budget_minutes > 0 else None,
+        )
+
+        slow_count = sum(1 for group_id in groups if self.latency.is_slow(group_id))
+        lines = [
+            "🧪 模拟打卡（未调用任何接口）",
+            f"⏰ {target.strftime('%m-%d %H:%M:%S')}，{'白名单' if whitelist_mode else '全群'}模式，{len(groups)} 个群",
+            f"⚙️ 并发 {concurrency}，速率 {rate:g}/s" + (f"，慢速通道 {slow_count} 个群" if slow_count else ""),
+            (
+                f"📐 耗时模型: {model.samples} 条历史记录，平均 {model.mean_latency * 1000:.0f}ms，"
+                f"失败率 {model.failure_rate:.1%}"
+                if model.samples else f"📐 没有打卡历史，按每群 {model.mean_latency * 1000:.0f}ms 估算"
+            ),
+            f"🏁 预计耗时 {format_duration(report.duration)}，"
+            f"预计完成 {(target + timedelta(seconds=report.duration)).strftime('%H:%M:%S')}",
+        ]
+        for priority, (count, first, last, deferred) in sorted(report.tiers.items()):
+            label = f"⭐ {PRIORITY_LABELS.get(priority, priority)}优先级: {count:.0f} 个"
+            if first <= last:
+                label += (
+                    f"，{(target + timedelta(seconds=first)).strftime('%H:%M:%S')} - "
+                    f"{(target + timedelta(seconds=last)).strftime('%H:%M:%S')}"
+                )
+            if deferred:
+                label += f"，{deferred:.0f} 个超出预算"
+            lines.append(label)
+        if report.started:
+            lines.append(
+                f"🚦 平均每群等待限速令牌 {report.throttle_wait / report.started:.2f}s"
+                f"（合计 {report.throttle_wait:.0f}s）"
+            )
+        if report.backoffs:
+            lines.append(
+                f"📉 预计失败 {report.expected_failures} 个，触发退避 {report.backoffs} 次，"
+                f"暂停合计 {report.paused_seconds:.0f}s，速率最低降至 {report.min_rate:.2f}/s"
+            )
+        else:
+            lines.append(f"📉 预计失败 {report.expected_failures} 个，不会触发自适应退避")
+        if report.deferred:
+            action = "推迟到重试队列" if self.config.get("budget_overflow_action", "defer") == "defer" else "本次跳过"
+            lines.append(f"⏳ 超出 {budget_minutes} 分钟预算: {report.deferred} 个群将{action}")
+        yield event.chain_result([Plain("\n".join(lines))])
+
     @filter.command("切换模式", alias=["打卡模式"])
     async def toggle_mode(self, event: AstrMessageEvent):
-        """切换打卡模式（白名单/全群）"""
-        await self._initialized.wait()
+        """切换打卡模式（白名单/全群），只修改插件配置，不需要等待数据加载"""
         current_mode = self.config.get("whitelist_mode", False)
         new_mode = not current_mode
         self.config["whitelist_mode"] = new_mode
@@ -621,7 +1861,21 @@ class QQGroupSignPlugin(Star):
 
     async def terminate(self):
         """插件终止时执行清理"""
+        # 先取消后台任务，再唤醒定时器：同一轮事件循环中既被唤醒又被取消时，
+        # wait_for 会吞掉取消信号导致任务继续等待
+        for task in (
+            self._init_task, self._background_init_task, self.direct_client_task,
+            self.retry_task, self.group_refresh_task,
+        ):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
         self._stop_event.set()
+        self.timer.interrupt()
         
         if self.task and not self.task.done():
             self.task.cancel()
@@ -629,5 +1883,17 @@ class QQGroupSignPlugin(Star):
                 await self.task
             except asyncio.CancelledError:
                 pass
+        await self._cancel_running_batches()
+        if self.notifier:
+            await self.notifier.close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if self.direct_client:
+            await self.direct_client.close()
+        
+        if self.backend is not None:
+            await self.store.close()
+            await self.history.close()
+            self.backend.close()
         
         logger.info("QQ群打卡插件已终止")
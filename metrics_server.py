@@ -0,0 +1,36 @@
+from astrbot.api import logger
+
+from .metrics import MetricsRegistry
+
+
+class MetricsServer:
+    """本地 /metrics HTTP 端点"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9466):
+        self.registry = registry
+        self.host = host
+        self.port = int(port)
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def handle_metrics(request):
+            return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError:
+            await self._runner.cleanup()
+            self._runner = None
+            raise
+        logger.info(f"指标端点已启动: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
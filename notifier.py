@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from astrbot.api import logger
+
+NOTIFY_HEADER = "📊 QQ群打卡通知"
+
+
+def split_chunks(lines: List[str], max_length: int) -> List[str]:
+    """按行把文本拼成不超过 max_length 的若干段，超长的单行会被截断成多段"""
+    chunks: List[str] = []
+    current = ""
+    for line in lines:
+        while len(line) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+        if current and len(current) + 1 + len(line) > max_length:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class AdminNotifier:
+    """管理员通知聚合器
+
+    通知先进入缓冲区，每个 window 秒合并成一条摘要发送；连续重复的通知折叠为一行并计数。
+    摘要超过 max_length 时分段发送，每段发送前通过 acquire 占用打卡限速器的令牌。
+    window <= 0 时每条通知立即发送。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        now_fn: Callable[[], datetime],
+        window: float = 30.0,
+        max_length: int = 1500,
+        acquire: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.send = send
+        self.now_fn = now_fn
+        self.window = max(0.0, float(window))
+        self.max_length = max(100, int(max_length))
+        self.acquire = acquire
+        self._buffer: List[Tuple[datetime, str]] = []
+        self._flush_handle: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # 统计信息
+        self.events = 0
+        self.messages_sent = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def add(self, message: str):
+        """登记一条通知，窗口结束时统一发送"""
+        self._buffer.append((self.now_fn(), message))
+        self.events += 1
+        if self.window <= 0:
+            await self.flush()
+        elif self._flush_handle is None or self._flush_handle.done():
+            self._flush_handle = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        while self._buffer:
+            await asyncio.sleep(self.window)
+            # 发送过程中被取消时让本次发送完成，剩余通知由 close 写出
+            await asyncio.shield(self.flush())
+
+    def _build_digest(self, events: List[Tuple[datetime, str]]) -> List[str]:
+        # 预留分段序号 "(n/m)" 的长度
+        limit = self.max_length - 12
+        if len(events) == 1:
+            lines = [NOTIFY_HEADER, *events[0][1].splitlines()]
+            return split_chunks(lines, limit)
+
+        lines = [f"{NOTIFY_HEADER} ({len(events)} 条)"]
+        index = 0
+        while index < len(events):
+            timestamp, message = events[index]
+            repeat = 1
+            while index + repeat < len(events) and events[index + repeat][1] == message:
+                repeat += 1
+            text = message.replace("\n", " | ")
+            lines.append(f"[{timestamp.strftime('%H:%M:%S')}] {text}" + (f" ×{repeat}" if repeat > 1 else ""))
+            index += repeat
+        return split_chunks(lines, limit)
+
+    async def flush(self):
+        """立即把缓冲区合并发送"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            events, self._buffer = self._buffer, []
+            chunks = self._build_digest(events)
+            for number, chunk in enumerate(chunks, 1):
+                if len(chunks) > 1:
+                    chunk = f"{chunk}\n({number}/{len(chunks)})"
+                try:
+                    if self.acquire:
+                        await self.acquire()
+                    await self.send(chunk)
+                    self.messages_sent += 1
+                except Exception as e:
+                    logger.error(f"发送管理员通知失败: {e}")
+            logger.debug(f"管理员通知已合并发送: {len(events)} 条通知，{len(chunks)} 条消息")
+
+    async def close(self):
+        """取消等待并发送剩余通知"""
+        if self._flush_handle and not self._flush_handle.done():
+            self._flush_handle.cancel()
+            try:
+                await self._flush_handle
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
@@ -0,0 +1,183 @@
+"""OneBot v11 直连客户端
+
+不依赖 AstrBot 适配器捕获的 bot 实例，插件启动后即可直接调用协议端接口。
+接口与 bot.api.call_action 一致，可以直接作为 bot_instance 或包装成 BotAccount 使用。
+
+- OneBotHttpClient: HTTP API，所有调用共用一个带连接池和 keep-alive 的 ClientSession
+- OneBotWsClient: 正向 WebSocket，所有调用共用一条连接，按 echo 字段匹配响应
+"""
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from astrbot.api import logger
+
+
+class OneBotActionFailed(Exception):
+    """协议端返回失败，带 retcode 属性，便于错误分类识别限流"""
+
+    def __init__(self, action: str, retcode: int, message: str = ""):
+        super().__init__(f"{action} 调用失败 (retcode={retcode}): {message}")
+        self.retcode = retcode
+
+
+def _unwrap(action: str, payload: Any) -> Any:
+    """取出响应中的 data，失败时抛出 OneBotActionFailed；retcode 1 表示已提交异步处理"""
+    if not isinstance(payload, dict):
+        raise OneBotActionFailed(action, -1, f"响应格式错误: {payload!r}"[:200])
+    retcode = payload.get("retcode", 0)
+    if payload.get("status") == "failed" or retcode not in (0, 1):
+        raise OneBotActionFailed(action, retcode, payload.get("wording") or payload.get("message") or "")
+    return payload.get("data")
+
+
+def _auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+class OneBotHttpClient:
+    """OneBot v11 HTTP API 客户端：POST <url>/<action>"""
+
+    def __init__(self, url: str, token: str = "", timeout: float = 30.0, pool_size: int = 32):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self._session = None
+
+    @property
+    def api(self) -> "OneBotHttpClient":
+        return self
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=_auth_headers(self.token),
+            )
+        return self._session
+
+    async def call_action(self, action: str, **params) -> Any:
+        # 连接本身对应一个账号，AstrBot 多账号路由用的 self_id 不需要发给协议端
+        params.pop("self_id", None)
+        async with self._get_session().post(f"{self.url}/{action}", json=params) as resp:
+            if resp.status != 200:
+                raise OneBotActionFailed(action, resp.status, await resp.text())
+            payload = await resp.json(content_type=None)
+        return _unwrap(action, payload)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class OneBotWsClient:
+    """OneBot v11 正向 WebSocket 客户端
+
+    请求带递增的 echo，后台读取任务按 echo 把响应交给对应的调用，因此多个调用可以同时在一条连接上等待。
+    没有 echo 的上报事件直接忽略。等待中的调用按连接分别登记，连接断开时只有该连接上的调用以
+    ConnectionError 失败，下次调用时重新连接。
+    """
+
+    def __init__(self, url: str, token: str = "", timeout: float = 30.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self._session = None
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        # 当前连接上等待响应的调用，echo -> Future；每次重连换一个新字典
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._echo = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def api(self) -> "OneBotWsClient":
+        return self
+
+    async def _ensure_connected(self) -> Tuple[Any, Dict[str, asyncio.Future]]:
+        """返回 (连接, 该连接的等待表)，未连接或已断开时重新连接"""
+        if self._ws is not None and not self._ws.closed:
+            return self._ws, self._pending
+        async with self._connect_lock:
+            if self._ws is not None and not self._ws.closed:
+                return self._ws, self._pending
+            import aiohttp
+
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            self._ws = await asyncio.wait_for(
+                self._session.ws_connect(
+                    self.url, headers=_auth_headers(self.token), heartbeat=30, max_msg_size=0
+                ),
+                self.timeout,
+            )
+            self._pending = {}
+            self._reader = asyncio.create_task(self._read_loop(self._ws, self._pending))
+            logger.info(f"OneBot WebSocket 已连接: {self.url}")
+            return self._ws, self._pending
+
+    async def _read_loop(self, ws, pending: Dict[str, asyncio.Future]):
+        import aiohttp
+
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    payload = json.loads(msg.data)
+                except json.JSONDecodeError:
+                    continue
+                echo = payload.get("echo") if isinstance(payload, dict) else None
+                future = pending.pop(str(echo), None) if echo is not None else None
+                if future is not None and not future.done():
+                    future.set_result(payload)
+        finally:
+            error = ConnectionError("OneBot WebSocket 连接已断开")
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            pending.clear()
+            if ws is self._ws:
+                logger.warning(f"OneBot WebSocket 连接已断开: {self.url}")
+
+    async def call_action(self, action: str, **params) -> Any:
+        params.pop("self_id", None)
+        ws, pending = await self._ensure_connected()
+        echo = str(next(self._echo))
+        future = asyncio.get_running_loop().create_future()
+        pending[echo] = future
+        try:
+            await ws.send_json({"action": action, "params": params, "echo": echo})
+            payload = await asyncio.wait_for(future, self.timeout)
+        finally:
+            pending.pop(echo, None)
+        return _unwrap(action, payload)
+
+    async def close(self):
+        # 先解除引用，读取任务结束时据此判断是主动关闭，不再记录断开警告
+        ws, self._ws = self._ws, None
+        if ws is not None and not ws.closed:
+            await ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+def create_onebot_client(url: str, token: str = "", timeout: float = 30.0):
+    """按 URL 协议创建客户端：ws:// wss:// 为 WebSocket，http:// https:// 为 HTTP"""
+    scheme = url.split("://", 1)[0].lower() if "://" in url else ""
+    if scheme in ("ws", "wss"):
+        return OneBotWsClient(url, token, timeout)
+    if scheme in ("http", "https"):
+        return OneBotHttpClient(url, token, timeout)
+    raise ValueError(f"不支持的 OneBot 地址: {url}（应以 http://、https://、ws:// 或 wss:// 开头）")
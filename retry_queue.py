@@ -0,0 +1,108 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from astrbot.api import logger
+
+# 错误分类
+TRANSIENT = "transient"
+RATE_LIMITED = "rate_limited"
+PERMANENT = "permanent"
+
+_PERMANENT_KEYWORDS = (
+    "not in group", "not a member", "kicked", "group not found", "not exist",
+    "不在群", "被踢", "已退出", "不存在", "已解散", "无权限", "permission denied",
+)
+_RATE_LIMIT_KEYWORDS = (
+    "rate limit", "too many", "too frequent", "频繁", "频率", "限流", "429",
+)
+
+
+def classify_error(error: Any) -> str:
+    """将打卡异常归类为 瞬时/限流/永久 三类"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return TRANSIENT
+
+    text = str(error).lower()
+    retcode = getattr(error, "retcode", None)
+    if retcode == 429 or any(k in text for k in _RATE_LIMIT_KEYWORDS):
+        return RATE_LIMITED
+    if any(k in text for k in _PERMANENT_KEYWORDS):
+        return PERMANENT
+    return TRANSIENT
+
+
+class RetryQueue:
+    """失败打卡的重试队列，按指数退避加抖动安排下次重试时间"""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 60.0, max_delay: float = 3600.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(1.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, group_id: str) -> bool:
+        return group_id in self._entries
+
+    def _compute_delay(self, attempts: int, error_class: str) -> float:
+        base = self.base_delay * (2 if error_class == RATE_LIMITED else 1)
+        delay = min(self.max_delay, base * (2 ** (attempts - 1)))
+        # 等比抖动：在 [delay/2, delay] 内随机，避免重试集中在同一时刻
+        return random.uniform(delay / 2, delay)
+
+    def push(self, group_id: str, error_class: str, message: str = "") -> bool:
+        """登记一次失败，返回是否会再次重试"""
+        group_id = str(group_id)
+        if error_class == PERMANENT:
+            self._entries.pop(group_id, None)
+            logger.info(f"群 {group_id} 打卡失败为永久性错误，不再重试: {message}")
+            return False
+
+        entry = self._entries.get(group_id, {"attempts": 0})
+        attempts = entry["attempts"] + 1
+        if attempts > self.max_attempts:
+            self._entries.pop(group_id, None)
+            logger.warning(f"群 {group_id} 已重试 {self.max_attempts} 次仍失败，放弃重试")
+            return False
+
+        self._entries[group_id] = {
+            "attempts": attempts,
+            "next_retry": time.time() + self._compute_delay(attempts, error_class),
+            "error_class": error_class,
+            "last_error": message[:200],
+        }
+        self.wakeup.set()
+        return True
+
+    def discard(self, group_id: str):
+        self._entries.pop(str(group_id), None)
+
+    def next_due(self) -> Optional[float]:
+        """最早一次重试的时间戳"""
+        if not self._entries:
+            return None
+        return min(entry["next_retry"] for entry in self._entries.values())
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """到期的群号（条目保留，直到成功或再次失败时更新）"""
+        now = time.time() if now is None else now
+        return [gid for gid, entry in self._entries.items() if entry["next_retry"] <= now]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._entries)
+
+    def restore(self, data: Optional[Dict[str, Any]]):
+        """从持久化数据恢复队列"""
+        if not isinstance(data, dict):
+            return
+        self._entries = {
+            str(gid): entry for gid, entry in data.items()
+            if isinstance(entry, dict) and "next_retry" in entry
+        }
+        if self._entries:
+            logger.info(f"已恢复 {len(self._entries)} 个待重试群组")
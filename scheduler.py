@@ -0,0 +1,135 @@
+import asyncio
+import zlib
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from astrbot.api import logger
+
+
+class PrecisionTimer:
+    """高精度定时器
+
+    asyncio 的定时基于单调时钟，不受系统时间调整影响；但目标时间是墙上时间，
+    所以长时间等待被拆成若干段，每段结束后按墙上时间重新计算剩余时间以修正漂移，
+    最后 fine_window 秒内改为短间隔精确等待。
+
+    interrupt 使代数 generation 加一。sleep_until 与调用方传入（或进入时记录）的代数比较，
+    因此在两次等待之间发生的打断也不会丢失。
+    """
+
+    def __init__(
+        self,
+        now_fn: Callable[[], datetime],
+        coarse_step: float = 300.0,
+        fine_window: float = 1.0,
+    ):
+        self.now_fn = now_fn
+        self.coarse_step = coarse_step
+        self.fine_window = fine_window
+        self.generation = 0
+        self._wakeup = asyncio.Event()
+        self.last_skew: Optional[float] = None
+
+    def interrupt(self):
+        """打断所有正在等待的 sleep_until，用于立即重新调度"""
+        self.generation += 1
+        # 唤醒等待旧事件的协程，之后的等待使用新事件，不需要清除共享状态
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def sleep_until(self, target: datetime, generation: Optional[int] = None) -> bool:
+        """等待到目标时间，返回 True 表示被 interrupt 打断
+
+        generation 为调用方开始依赖当前时间表时记录的代数，之后发生过 interrupt 则立即返回 True；
+        不传时以进入时的代数为准
+        """
+        if generation is None:
+            generation = self.generation
+        while True:
+            if self.generation != generation:
+                return True
+            remaining = (target - self.now_fn()).total_seconds()
+            if remaining <= 0:
+                return False
+            if remaining > self.fine_window:
+                # 粗等待：留出精确等待窗口，每段不超过 coarse_step
+                timeout = min(remaining - self.fine_window, self.coarse_step)
+            elif remaining > 0.005:
+                timeout = remaining - 0.002
+            else:
+                timeout = remaining
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def record_skew(self, target: datetime) -> float:
+        """记录实际触发时间与目标时间的偏差（秒，正数表示晚于目标）"""
+        skew = (self.now_fn() - target).total_seconds()
+        self.last_skew = skew
+        if abs(skew) > 0.5:
+            logger.warning(f"定时任务触发偏差较大: {skew * 1000:+.1f}ms")
+        return skew
+
+
+def parse_time_str(time_str: str) -> time:
+    """解析 HH:MM:SS 格式的时间，格式错误抛出 ValueError"""
+    hour, minute, second = map(int, str(time_str).strip().split(':'))
+    if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
+        raise ValueError(f"时间超出范围: {time_str}")
+    return time(hour, minute, second)
+
+
+def next_occurrence(slot: time, now: datetime) -> datetime:
+    """slot 在 now 之后（不含 now）的下一次发生时间"""
+    target = now.replace(hour=slot.hour, minute=slot.minute, second=slot.second, microsecond=0)
+    if now >= target:
+        target += timedelta(days=1)
+    return target
+
+
+class ScheduleTable:
+    """打卡时间表
+
+    - slots: 每日打卡时间点，未单独设置时间的群按群号哈希固定分配到其中一个时间点
+    - overrides: 单独设置了打卡时间的群
+    - spread_minutes: 每个时间点内按群号哈希把群均匀分散到 N 分钟内，结果固定不变
+    """
+
+    def __init__(self, slots: List[time], overrides: Dict[str, time], spread_minutes: int = 0):
+        self.slots = sorted(set(slots)) or [time(8, 0, 0)]
+        self.overrides = overrides
+        self.spread_seconds = max(0, int(spread_minutes)) * 60
+
+    @staticmethod
+    def _hash(group_id: str) -> int:
+        # 内置 hash() 每次启动随机化，这里需要跨重启稳定
+        return zlib.crc32(str(group_id).encode())
+
+    def slot_for(self, group_id: str) -> time:
+        override = self.overrides.get(group_id)
+        if override is not None:
+            return override
+        return self.slots[self._hash(group_id) % len(self.slots)]
+
+    def spread_offset(self, group_id: str) -> float:
+        """群在所属时间点内的延后秒数"""
+        if not self.spread_seconds:
+            return 0.0
+        return float((self._hash(group_id) >> 8) % self.spread_seconds)
+
+    def all_slots(self) -> List[time]:
+        return sorted(set(self.slots) | set(self.overrides.values()))
+
+    def groups_for(self, slot: time, groups: Iterable[str]) -> List[str]:
+        """筛选属于该时间点的群，按分散偏移排序"""
+        if len(self.slots) == 1 and not self.overrides:
+            selected = list(groups)
+        else:
+            selected = [gid for gid in groups if self.slot_for(gid) == slot]
+        if self.spread_seconds:
+            selected.sort(key=self.spread_offset)
+        return selected
+
+    def next_run(self, now: datetime) -> datetime:
+        return min(next_occurrence(slot, now) for slot in self.all_slots())
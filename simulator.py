@@ -0,0 +1,167 @@
+import heapq
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .dispatcher import PRIORITY_HIGH, AdaptiveRate, ReadyQueue, TokenMeter
+
+# 没有任何历史记录时假设的单群打卡耗时（秒）
+DEFAULT_LATENCY = 0.5
+
+
+def format_duration(seconds: float) -> str:
+    """把秒数格式化为 X小时Y分Z秒"""
+    if seconds < 60:
+        return f"{seconds:.1f}秒"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分{secs}秒" if hours else f"{minutes}分{secs}秒"
+
+
+class LatencyModel:
+    """由打卡历史得到的耗时和失败率模型，没有记录的群使用全部记录的平均值"""
+
+    def __init__(self, profile: Dict[str, Tuple[int, int, float]]):
+        # profile: 群号 -> (成功次数, 失败次数, 总耗时毫秒)
+        self._groups: Dict[str, Tuple[float, float]] = {}
+        attempts = failures = 0
+        latency_ms = 0.0
+        for group_id, (ok, fail, total_ms) in profile.items():
+            count = ok + fail
+            if count <= 0:
+                continue
+            self._groups[group_id] = (total_ms / count / 1000, fail / count)
+            attempts += count
+            failures += fail
+            latency_ms += total_ms
+        self.samples = attempts
+        self.mean_latency = latency_ms / attempts / 1000 if attempts else DEFAULT_LATENCY
+        self.failure_rate = failures / attempts if attempts else 0.0
+
+    def latency(self, group_id: str) -> float:
+        stats = self._groups.get(group_id)
+        return stats[0] if stats else self.mean_latency
+
+    def failure(self, group_id: str) -> float:
+        stats = self._groups.get(group_id)
+        return stats[1] if stats else self.failure_rate
+
+
+class SimLane:
+    """一个调度器通道：并发上限、共用或独立的令牌桶，退避规则与 SignDispatcher 共用 AdaptiveRate"""
+
+    def __init__(
+        self,
+        name: str,
+        items: Sequence[Tuple[str, int, float]],
+        concurrency: int,
+        bucket: TokenMeter,
+        adaptive: bool = True,
+        failure_threshold: float = 0.2,
+        window: int = 50,
+    ):
+        self.name = name
+        self.items = list(items)
+        # 与 SignDispatcher.iter_results 相同的执行顺序：偏移已到的任务中按优先级取
+        self.queue = ReadyQueue(
+            len(self.items),
+            [item[2] for item in self.items],
+            [item[1] for item in self.items],
+        )
+        self.concurrency = max(1, int(concurrency))
+        self.bucket = bucket
+        self.base_rate = bucket.rate
+        self.policy = AdaptiveRate(self.base_rate, adaptive, failure_threshold, window)
+        self.pause_until = 0.0
+        self.backoffs = 0
+        self.paused_seconds = 0.0
+
+    def record(self, ok: bool, now: float):
+        change = self.policy.record(ok, self.bucket.rate)
+        if change is None:
+            return
+        new_rate, pause = change
+        self.bucket.set_rate(new_rate, now)
+        if pause:
+            self.pause_until = now + pause
+            self.backoffs += 1
+            self.paused_seconds += pause
+
+
+class SimulationReport:
+    def __init__(self):
+        self.duration = 0.0
+        self.started = 0
+        self.expected_failures = 0
+        self.throttle_wait = 0.0
+        self.deferred = 0
+        # 优先级 -> [群数, 最早开始, 最晚完成, 推迟数]
+        self.tiers: Dict[int, List[float]] = {}
+        self.lanes: List[SimLane] = []
+
+    @property
+    def backoffs(self) -> int:
+        return sum(lane.backoffs for lane in self.lanes)
+
+    @property
+    def paused_seconds(self) -> float:
+        return sum(lane.paused_seconds for lane in self.lanes)
+
+    @property
+    def min_rate(self) -> Optional[float]:
+        rates = [lane.bucket.min_rate for lane in self.lanes if lane.base_rate > 0]
+        return min(rates) if rates else None
+
+
+def simulate(
+    lanes: List[SimLane],
+    latency: Callable[[str], float],
+    failure: Callable[[str], float],
+    deadline: Optional[float] = None,
+    seed: int = 0,
+) -> SimulationReport:
+    """在虚拟时钟上模拟一批打卡，不调用任何接口
+
+    每个通道有 concurrency 个工作者按 ReadyQueue 取偏移已到的任务，超出 deadline 的非高优先级任务
+    直接推迟，否则等待退避暂停和令牌后开始，耗时取模型均值，失败按模型失败率随机抽样。
+    所有通道按事件时间交替推进，共用令牌桶的通道按请求时间排队。
+    """
+    rng = random.Random(seed)
+    report = SimulationReport()
+    report.lanes = lanes
+    workers = [[0.0] * min(lane.concurrency, len(lane.items)) for lane in lanes]
+    pending: List[Tuple[float, int]] = []
+    for index, lane in enumerate(lanes):
+        if lane.items:
+            heapq.heappush(pending, (lane.queue.ready_at(0.0), index))
+
+    while pending:
+        ready, index = heapq.heappop(pending)
+        lane, free = lanes[index], workers[index]
+        heapq.heappop(free)
+        group_id, priority, _ = lane.items[lane.queue.pop(ready)]
+        tier = report.tiers.setdefault(priority, [0, float("inf"), 0.0, 0])
+        tier[0] += 1
+
+        if deadline is not None and ready >= deadline and priority > PRIORITY_HIGH:
+            tier[3] += 1
+            report.deferred += 1
+            heapq.heappush(free, ready)
+        else:
+            requested = max(ready, lane.pause_until)
+            start = lane.bucket.reserve(requested)
+            finish = start + latency(group_id)
+            ok = rng.random() >= failure(group_id)
+            lane.record(ok, finish)
+            report.throttle_wait += start - requested
+            report.started += 1
+            report.expected_failures += 0 if ok else 1
+            report.duration = max(report.duration, finish)
+            tier[1] = min(tier[1], start)
+            tier[2] = max(tier[2], finish)
+            heapq.heappush(free, finish)
+
+        # 空闲的工作者也不会早于本次取任务的时间取到任务
+        ready_at = lane.queue.ready_at(max(free[0], ready))
+        if ready_at is not None:
+            heapq.heappush(pending, (ready_at, index))
+    return report
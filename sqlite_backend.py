@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import tzinfo
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+from .history import ROLLUP_RETENTION_DAYS, day_of
+from .storage import (
+    DIRECTORY_DOCUMENT,
+    LATENCY_DOCUMENT,
+    LEDGER_DOCUMENT,
+    RETRY_DOCUMENT,
+    STATE_DOCUMENT,
+    JsonBackend,
+)
+
+# 从 JSON 后端迁移的文档
+MIGRATED_DOCUMENTS = (STATE_DOCUMENT, RETRY_DOCUMENT, DIRECTORY_DOCUMENT, LEDGER_DOCUMENT, LATENCY_DOCUMENT)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS whitelist (
+    group_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_state (
+    group_id TEXT PRIMARY KEY,
+    schedule TEXT,
+    priority INTEGER
+);
+CREATE TABLE IF NOT EXISTS sign_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    path TEXT,
+    latency_ms REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sign_history_group_ts ON sign_history (group_id, ts);
+CREATE INDEX IF NOT EXISTS idx_sign_history_ts ON sign_history (ts);
+CREATE TABLE IF NOT EXISTS sign_daily (
+    day TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 0,
+    fail INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, group_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sign_daily_group ON sign_daily (group_id, day);
+"""
+
+
+class SqliteBackend:
+    """SQLite 存储后端（WAL 模式），白名单、群状态和打卡历史均为带索引的表
+
+    状态文档中的白名单和各群的时间、优先级拆到 whitelist 和 group_state 表，
+    保存时与内存中的上次写入结果比较，只写入变化的行。
+    连接在多个工作线程间共享，所有操作都在锁内执行。
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path, data_dir: Path, tz: tzinfo):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(group_state)")}
+            if columns and "schedule" not in columns:
+                # 早期版本的 group_state 只记录最近一次打卡结果，从未读取过
+                self._conn.execute("DROP TABLE group_state")
+            self._conn.executescript(_SCHEMA)
+        # 已写入表中的白名单位置和各群状态，用于计算差异
+        self._whitelist: Dict[str, int] = dict(self._conn.execute("SELECT group_id, position FROM whitelist"))
+        self._group_state: Dict[str, Tuple[Optional[str], Optional[int]]] = {
+            gid: (schedule, priority)
+            for gid, schedule, priority in self._conn.execute("SELECT group_id, schedule, priority FROM group_state")
+        }
+        self._migrate_from_json(data_dir, tz)
+        self._split_state_document()
+
+    @property
+    def history_sink(self) -> "SqliteBackend":
+        return self
+
+    def _migrate_from_json(self, data_dir: Path, tz: tzinfo):
+        """导入 JSON 后端的数据
+
+        打卡历史只在首次启用时导入；文档按名称记录在 meta 中，
+        之后新增的文档类型在下次启动时补充导入（数据库中已有该文档时不覆盖）
+        """
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_documents'").fetchone()
+        done = set(json.loads(row[0])) if row else set()
+        first = not self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if first:
+            done = set()
+        elif not row:
+            # 早期版本只迁移了这两个文档
+            done = {STATE_DOCUMENT, RETRY_DOCUMENT}
+        if not first and done.issuperset(MIGRATED_DOCUMENTS):
+            return
+
+        legacy = JsonBackend(data_dir)
+        migrated = []
+        for name in MIGRATED_DOCUMENTS:
+            if name in done:
+                continue
+            exists = self._conn.execute("SELECT 1 FROM documents WHERE name = ?", (name,)).fetchone()
+            data = None if exists else legacy.read_document(name)
+            if data is not None:
+                self.write_document(name, json.dumps(data, ensure_ascii=False))
+                migrated.append(name)
+
+        if first:
+            migrated += self._migrate_history(legacy, tz)
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', '1')")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_documents', ?)",
+                (json.dumps(sorted(done | set(MIGRATED_DOCUMENTS))),),
+            )
+        if migrated:
+            logger.info(f"已从 JSON 迁移到 SQLite: {', '.join(migrated)}")
+
+    def _migrate_history(self, legacy: JsonBackend, tz: tzinfo) -> List[str]:
+        """导入 JSONL 打卡明细和按天汇总"""
+        migrated = []
+        sink = legacy.history_sink
+        if os.path.exists(sink.log_path):
+            records = [
+                {"g": r["g"], "t": r["t"], "p": r.get("p"), "l": r.get("l", 0), "e": r.get("e")}
+                for _, r in sink.iter_records()
+            ]
+            self.append(records, tz)
+            migrated.append(f"{len(records)} 条打卡历史")
+        rollups = sink.load_rollups()
+        if rollups:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO sign_daily (day, group_id, ok, fail, latency_ms) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (day, gid, stats.get("ok", 0), stats.get("fail", 0), stats.get("latency_ms", 0))
+                        for day, groups in rollups.items()
+                        for gid, stats in groups.items()
+                    ],
+                )
+            migrated.append(f"{len(rollups)} 天打卡汇总")
+        return migrated
+
+    def _split_state_document(self):
+        """早期版本把各群时间和优先级存在状态文档中，重新写入一次以拆到 group_state 表"""
+        row = self._conn.execute("SELECT value FROM documents WHERE name = ?", (STATE_DOCUMENT,)).fetchone()
+        if row is None:
+            return
+        data = json.loads(row[0])
+        if "group_schedules" in data or "group_priorities" in data:
+            data["whitelist_groups"] = sorted(self._whitelist, key=self._whitelist.__getitem__)
+            self.write_document(STATE_DOCUMENT, json.dumps(data, ensure_ascii=False))
+
+    # ---- 文档 ----
+
+    def read_document(self, name: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM documents WHERE name = ?", (name,)).fetchone()
+            data = json.loads(row[0]) if row else None
+            if name != STATE_DOCUMENT:
+                return data
+            # 白名单和各群状态单独存表，读取时拼回文档，白名单按加入顺序
+            whitelist = [gid for (gid,) in self._conn.execute("SELECT group_id FROM whitelist ORDER BY position")]
+            rows = self._conn.execute("SELECT group_id, schedule, priority FROM group_state").fetchall()
+        if data is None and not whitelist and not rows:
+            return None
+        data = data or {}
+        data["whitelist_groups"] = whitelist
+        data["group_schedules"] = {gid: schedule for gid, schedule, _ in rows if schedule is not None}
+        data["group_priorities"] = {gid: priority for gid, _, priority in rows if priority is not None}
+        return data
+
+    def write_document(self, name: str, content: str):
+        if name != STATE_DOCUMENT:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (name, value) VALUES (?, ?)", (name, content)
+                )
+            return
+
+        data = json.loads(content)
+        whitelist = [str(gid) for gid in data.pop("whitelist_groups", [])]
+        schedules = data.pop("group_schedules", {})
+        priorities = data.pop("group_priorities", {})
+        group_state = {
+            gid: (schedules.get(gid), priorities.get(gid)) for gid in schedules.keys() | priorities.keys()
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (name, value) VALUES (?, ?)",
+                (name, json.dumps(data, ensure_ascii=False)),
+            )
+            self._write_whitelist(whitelist)
+            self._write_group_state(group_state)
+
+    def _write_whitelist(self, whitelist: List[str]):
+        """只写入白名单中增删或移动的群"""
+        old = self._whitelist
+        removed = []
+        if len(whitelist) != len(old) or any(gid not in old for gid in whitelist):
+            members = set(whitelist)
+            removed = [gid for gid in old if gid not in members]
+        # 位置递增的最长前缀保持不动，之后的群（新加入或重新加入的）接在最大位置之后
+        last, keep = -1, len(whitelist)
+        for index, gid in enumerate(whitelist):
+            position = old.get(gid)
+            if position is None or position <= last:
+                keep = index
+                break
+            last = position
+        if keep == len(whitelist) and not removed:
+            return
+        start = max(old.values(), default=-1) + 1
+        changed = [(gid, start + i) for i, gid in enumerate(whitelist[keep:])]
+
+        self._conn.executemany("DELETE FROM whitelist WHERE group_id = ?", [(gid,) for gid in removed])
+        self._conn.executemany(
+            "INSERT INTO whitelist (group_id, position) VALUES (?, ?) "
+            "ON CONFLICT (group_id) DO UPDATE SET position = excluded.position",
+            changed,
+        )
+        for gid in removed:
+            del old[gid]
+        old.update(changed)
+
+    def _write_group_state(self, group_state: Dict[str, Tuple[Optional[str], Optional[int]]]):
+        """按群 upsert 时间或优先级有变化的行，两者都取消的群删除"""
+        old = self._group_state
+        if group_state == old:
+            return
+        removed = [gid for gid in old if gid not in group_state]
+        changed = [(gid, *state) for gid, state in group_state.items() if old.get(gid) != state]
+        self._conn.executemany("DELETE FROM group_state WHERE group_id = ?", [(gid,) for gid in removed])
+        self._conn.executemany(
+            "INSERT INTO group_state (group_id, schedule, priority) VALUES (?, ?, ?) "
+            "ON CONFLICT (group_id) DO UPDATE SET schedule = excluded.schedule, priority = excluded.priority",
+            changed,
+        )
+        for gid in removed:
+            del old[gid]
+        old.update((gid, (schedule, priority)) for gid, schedule, priority in changed)
+
+    # ---- 打卡历史 ----
+
+    def append(self, records: List[Dict[str, Any]], tz: tzinfo):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sign_history (group_id, ts, path, latency_ms, error) VALUES (?, ?, ?, ?, ?)",
+                [(r["g"], r["t"], r["p"], r["l"], r["e"]) for r in records],
+            )
+            self._conn.executemany(
+                "INSERT INTO sign_daily (day, group_id, ok, fail, latency_ms) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (day, group_id) DO UPDATE SET "
+                "ok = ok + excluded.ok, fail = fail + excluded.fail, latency_ms = latency_ms + excluded.latency_ms",
+                [
+                    (day_of(r["t"], tz), r["g"], 0 if r["e"] else 1, 1 if r["e"] else 0, r["l"])
+                    for r in records
+                ],
+            )
+
+    def compact(self, cutoff: float, tz: tzinfo) -> int:
+        """按天统计在写入时已增量维护，这里只删除过期明细和过旧的汇总"""
+        oldest_day = day_of(cutoff - ROLLUP_RETENTION_DAYS * 86400, tz)
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM sign_history WHERE ts < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM sign_daily WHERE day < ?", (oldest_day,))
+        return deleted
+
+    def failing_groups(self, days: int, tz: tzinfo) -> List[str]:
+        with self._lock:
+            recent_days = [
+                day for (day,) in self._conn.execute(
+                    "SELECT DISTINCT day FROM sign_daily ORDER BY day DESC LIMIT ?", (days,)
+                )
+            ]
+            if len(recent_days) < days:
+                return []
+            rows = self._conn.execute(
+                "SELECT group_id FROM sign_daily WHERE day >= ? "
+                "GROUP BY group_id HAVING COUNT(*) = ? AND SUM(ok) = 0 AND SUM(fail) > 0 "
+                "ORDER BY group_id",
+                (recent_days[-1], days),
+            ).fetchall()
+        return [gid for (gid,) in rows]
+
+    def latency_profile(self) -> Dict[str, Tuple[int, int, float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT group_id, SUM(ok), SUM(fail), SUM(latency_ms) FROM sign_daily GROUP BY group_id"
+            ).fetchall()
+        return {gid: (ok, fail, latency_ms) for gid, ok, fail, latency_ms in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
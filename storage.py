@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import time
+from datetime import tzinfo
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from astrbot.api import logger
+
+# 文档名，JSON 后端下对应 <name>.json
+STATE_DOCUMENT = "group_sign_data"
+RETRY_DOCUMENT = "sign_retry_queue"
+DIRECTORY_DOCUMENT = "group_directory"
+LEDGER_DOCUMENT = "sign_ledger"
+LATENCY_DOCUMENT = "group_latency"
+
+
+def write_atomic(path: Path, content: str):
+    """写入临时文件并 fsync 后原子替换"""
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonBackend:
+    """默认存储后端：每个文档一个 JSON 文件，历史记录为 JSONL"""
+
+    name = "json"
+
+    def __init__(self, data_dir: Path):
+        from .history import JsonlHistorySink
+
+        self.data_dir = data_dir
+        self.history_sink = JsonlHistorySink(
+            data_dir / "sign_history.jsonl",
+            data_dir / "sign_history_daily.json",
+        )
+
+    def document_path(self, name: str) -> Path:
+        return self.data_dir / f"{name}.json"
+
+    def read_document(self, name: str) -> Optional[Any]:
+        """读取文档，不存在返回 None；文件损坏时备份后返回 None"""
+        path = self.document_path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error(f"{path.name} 解析失败: {e}")
+            corrupted_file = f"{path}.corrupted"
+            os.replace(path, corrupted_file)
+            logger.warning(f"已备份损坏文件到: {corrupted_file}")
+            return None
+
+    def write_document(self, name: str, content: str):
+        """写入已序列化的文档"""
+        write_atomic(self.document_path(name), content)
+
+    def close(self):
+        pass
+
+
+def create_backend(kind: str, data_dir: Path, tz: tzinfo):
+    """按配置创建存储后端，未知类型回退到 JSON"""
+    if kind == "sqlite":
+        from .sqlite_backend import SqliteBackend
+        return SqliteBackend(data_dir / "group_sign.db", data_dir, tz)
+    if kind != "json":
+        logger.warning(f"未知的存储后端 {kind}，使用 json")
+    return JsonBackend(data_dir)
+
+
+class WriteBehindStore:
+    """写回式持久化：标记脏数据，在防抖间隔结束或关闭时合并落盘"""
+
+    def __init__(self, backend, debounce: float = 2.0):
+        self.backend = backend
+        self.debounce = max(0.0, float(debounce))
+        self._documents: Dict[str, Callable[[], Any]] = {}
+        self._dirty: Set[str] = set()
+        self._flush_handle: Optional[asyncio.Task] = None
+        # 防抖结束后正在执行的写入，关闭时等待它完成而不是取消
+        self._flushing: Optional[asyncio.Future] = None
+        self._lock = asyncio.Lock()
+        # 统计信息
+        self.writes = 0
+        self.writes_coalesced = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    def register(self, name: str, snapshot: Callable[[], Any]):
+        """注册一个文档，snapshot 返回需要序列化的数据"""
+        self._documents[name] = snapshot
+
+    async def read(self, name: str) -> Optional[Any]:
+        """从后端读取文档"""
+        return await asyncio.to_thread(self.backend.read_document, name)
+
+    def mark_dirty(self, name: str):
+        """标记文档待写入，防抖间隔内的重复标记会被合并"""
+        if name in self._dirty:
+            self.writes_coalesced += 1
+        self._dirty.add(name)
+        if self._flush_handle is None or self._flush_handle.done():
+            self._flush_handle = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # 写入期间新标记的文档由同一个任务在下一个间隔处理
+        while self._dirty:
+            await asyncio.sleep(self.debounce)
+            # 线程中的写入无法中断，取消防抖任务时让本次写入继续完成
+            self._flushing = asyncio.ensure_future(self.flush())
+            await asyncio.shield(self._flushing)
+
+    async def flush(self):
+        """立即写入所有脏文档"""
+        async with self._lock:
+            if not self._dirty:
+                return
+            names, self._dirty = self._dirty, set()
+            pending = set(names)
+            start = time.perf_counter()
+            try:
+                for name in names:
+                    try:
+                        # 在事件循环线程中序列化，保证快照一致；IO 放到线程里
+                        content = json.dumps(self._documents[name](), ensure_ascii=False)
+                        await asyncio.to_thread(self.backend.write_document, name, content)
+                        self.writes += 1
+                        pending.discard(name)
+                    except Exception as e:
+                        logger.error(f"保存 {name} 失败: {e}")
+            finally:
+                # 写入失败或被取消的文档保持脏状态，等待下一次落盘
+                self._dirty |= pending
+            self.last_flush_latency = time.perf_counter() - start
+            self.max_flush_latency = max(self.max_flush_latency, self.last_flush_latency)
+            logger.debug(f"持久化完成: {len(names)} 个文档，耗时 {self.last_flush_latency * 1000:.1f}ms")
+
+    async def close(self):
+        """取消防抖任务，等待进行中的写入完成后写入剩余数据"""
+        if self._flush_handle and not self._flush_handle.done():
+            self._flush_handle.cancel()
+            try:
+                await self._flush_handle
+            except asyncio.CancelledError:
+                pass
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        await self.flush()
@@ -0,0 +1,84 @@
+from array import array
+from typing import Any, Dict, List, Union
+
+# 不同失败原因最多分别统计这么多种，其余归入“其他错误”，避免原因里带有群号等可变内容时无限增长
+MAX_REASONS = 50
+OTHER_REASON = "其他错误"
+
+
+class BatchTally:
+    """一个打卡批次的结果计数
+
+    结果逐个计入，不保留每个群的结果和消息：失败的群按原因归类，群号存为 array('q')，
+    无法转成整数的群号单独存放。
+    """
+
+    __slots__ = ("success", "deferred", "failed", "_reasons")
+
+    def __init__(self):
+        self.success = 0
+        self.deferred = 0
+        self.failed = 0
+        self._reasons: Dict[str, Union[array, List[str]]] = {}
+
+    @property
+    def total(self) -> int:
+        return self.success + self.deferred + self.failed
+
+    @staticmethod
+    def _reason(group_id: str, message: str) -> str:
+        # 打卡结果的消息以“群 <群号> ”开头，去掉后同类错误才能合并；错误内容里的群号也替换掉
+        prefix = f"群 {group_id} "
+        if message.startswith(prefix):
+            message = message[len(prefix):]
+        if group_id:
+            message = message.replace(str(group_id), "<群号>")
+        return message.strip()[:120] or "未知错误"
+
+    def add(self, group_id: str, result: Dict[str, Any]):
+        """计入一个群的打卡结果 {"success": bool, "message": str, "deferred"?: bool}"""
+        if result.get("success"):
+            self.success += 1
+        elif result.get("deferred"):
+            self.deferred += 1
+        else:
+            self.add_failure(group_id, result.get("message", "未知错误"))
+
+    def add_failure(self, group_id: str, message: str):
+        self.failed += 1
+        reason = self._reason(group_id, message)
+        if reason not in self._reasons and len(self._reasons) >= MAX_REASONS:
+            reason = OTHER_REASON
+        groups = self._reasons.get(reason)
+        try:
+            value = int(group_id)
+            if groups is None:
+                groups = self._reasons[reason] = array('q')
+            if isinstance(groups, array):
+                groups.append(value)
+                return
+        except ValueError:
+            pass
+        # 非数字群号：该原因下改为字符串列表保存
+        if groups is None or isinstance(groups, array):
+            groups = self._reasons[reason] = [str(g) for g in (groups or ())]
+        groups.append(str(group_id))
+
+    def failed_groups(self, limit: int) -> List[str]:
+        """按原因顺序取出最多 limit 个失败的群号"""
+        result: List[str] = []
+        for groups in self._reasons.values():
+            for group_id in groups:
+                if len(result) >= limit:
+                    return result
+                result.append(str(group_id))
+        return result
+
+    def failure_lines(self, per_line: int = 20) -> List[str]:
+        """失败明细：每个原因一行标题，之后每行最多 per_line 个群号"""
+        lines = []
+        for reason, groups in self._reasons.items():
+            lines.append(f"{reason} ({len(groups)} 个):")
+            for start in range(0, len(groups), per_line):
+                lines.append("  " + ", ".join(str(g) for g in groups[start:start + per_line]))
+        return lines
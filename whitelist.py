@@ -0,0 +1,69 @@
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# 群号只取连续数字，粘贴的列表可以用空格、逗号、换行等任意分隔
+_GROUP_ID_PATTERN = re.compile(r"\d+")
+
+
+def parse_group_ids(text: str) -> List[str]:
+    """从文本中提取群号，保持出现顺序并去重"""
+    return list(dict.fromkeys(_GROUP_ID_PATTERN.findall(text or "")))
+
+
+def format_preview(group_ids: List[str], limit: int = 20) -> str:
+    """最多列出 limit 个群号，其余只给出数量"""
+    if not group_ids:
+        return "无"
+    preview = ", ".join(group_ids[:limit])
+    if len(group_ids) > limit:
+        preview += f" ... 等 {len(group_ids)} 个"
+    return preview
+
+
+class Whitelist:
+    """白名单：保持加入顺序的集合，成员判断和增删为 O(1)"""
+
+    def __init__(self, group_ids: Optional[Iterable[str]] = None):
+        self._groups = dict.fromkeys(str(gid) for gid in group_ids or ())
+
+    def __contains__(self, group_id: str) -> bool:
+        return group_id in self._groups
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._groups)
+
+    def add(self, group_id: str) -> bool:
+        """加入一个群，返回是否为新加入"""
+        if group_id in self._groups:
+            return False
+        self._groups[group_id] = None
+        return True
+
+    def discard(self, group_id: str) -> bool:
+        """移除一个群，返回是否原本在白名单中"""
+        if group_id not in self._groups:
+            return False
+        del self._groups[group_id]
+        return True
+
+    def update(self, group_ids: Iterable[str]) -> List[str]:
+        """批量加入，返回新加入的群号"""
+        return [gid for gid in group_ids if self.add(gid)]
+
+    def remove_many(self, group_ids: Iterable[str]) -> List[str]:
+        """批量移除，返回实际移除的群号"""
+        return [gid for gid in group_ids if self.discard(gid)]
+
+    def page(self, number: int, size: int) -> Tuple[List[str], int]:
+        """按页取出群号，页码从 1 开始并限制在有效范围内，返回 (本页群号, 总页数)"""
+        pages = max(1, -(-len(self._groups) // size))
+        number = min(max(1, number), pages)
+        start = (number - 1) * size
+        return list(islice(self._groups, start, start + size)), pages
+
+    def to_list(self) -> List[str]:
+        return list(self._groups)